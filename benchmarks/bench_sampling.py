@@ -0,0 +1,45 @@
+'''
+Compare the variance-reduction modes of the simulator by the effective
+sample size and confidence interval of the mean cost for the same number
+of trials.
+
+Usage: python benchmarks/bench_sampling.py [rept] [noc]
+'''
+import os
+import sys
+import time
+
+from scipy.stats import exponweib
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+from utils.runner import (  # noqa: E402
+    estimate_mean,
+    replicate_groups,
+    run_simulation
+)
+from utils.sim import SAMPLING, has_sobol  # noqa: E402
+
+
+def main(rept=2500, noc=10):
+    dist = exponweib(a=1, loc=0, c=1.5, scale=20000)
+    cutoff = 10000
+    tlen = 3*5000
+    print(f'{rept} repeats x {noc} components')
+    for mtype in ['Component-wise', 'Fleetwide']:
+        print(mtype)
+        for sampling in SAMPLING:
+            if sampling == 'Sobol' and not has_sobol():
+                continue
+            start = time.perf_counter()
+            [_, m, f] = run_simulation(mtype, dist, cutoff, noc, tlen, rept,
+                                       seed=0, workers=1, sampling=sampling)
+            elapsed = time.perf_counter() - start
+            cost = 3000*m.sum(axis=1) + 20000*f.sum(axis=1)
+            est = estimate_mean(cost, replicate_groups(rept, sampling))
+            print(f'  {sampling:16s} {elapsed:.3f}s  mean {est["mean"]:.0f}'
+                  f'  CI [{est["low"]:.0f}, {est["high"]:.0f}]'
+                  f'  ESS {est["ess"]:.0f}')
+
+
+if __name__ == '__main__':
+    main(*[int(x) for x in sys.argv[1:3]])
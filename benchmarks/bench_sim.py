@@ -0,0 +1,73 @@
+'''
+Benchmark the batch Monte Carlo engines against the scalar loops of
+`simulate_bycomponent` and `get_durations_fleetwide`, and compare their mean
+counts.
+
+Usage: python benchmarks/bench_sim.py [rept] [noc]
+'''
+import os
+import sys
+import time
+
+import numpy as np
+from scipy.stats import exponweib
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+from utils.sim import (  # noqa: E402
+    get_durations_fleetwide,
+    simulate_bycomponent,
+    simulate_bycomponent_batch,
+    simulate_fleetwide_batch
+)
+
+
+def report(name, loop, batch, ms, fs, m, f):
+    print(name)
+    print(f'  loop:  {loop:.4f}s  maintenances {np.mean(ms):.3f}  '
+          f'failures {np.mean(fs):.3f}')
+    print(f'  batch: {batch:.4f}s  maintenances {m.sum(axis=1).mean():.3f}  '
+          f'failures {f.sum(axis=1).mean():.3f}')
+    print(f'  speedup: {loop/batch:.1f}x')
+
+
+def main(rept=20, noc=10):
+    dist = exponweib(a=1, loc=0, c=1.5, scale=20000)
+    cutoff = 10000
+    tlen = 10*5000
+    print(f'{rept} repeats x {noc} components')
+
+    start = time.perf_counter()
+    ms = []
+    fs = []
+    for _ in range(rept):
+        [_, m, f] = simulate_bycomponent(dist, cutoff, noc, tlen)
+        ms.append(sum(m))
+        fs.append(sum(f))
+    loop = time.perf_counter() - start
+
+    start = time.perf_counter()
+    [_, m, f] = simulate_bycomponent_batch(dist, cutoff, noc, tlen, rept,
+                                           random_state=0)
+    batch = time.perf_counter() - start
+
+    report('Component-wise', loop, batch, ms, fs, m, f)
+
+    start = time.perf_counter()
+    ms = []
+    fs = []
+    for _ in range(rept):
+        durations = [get_durations_fleetwide(tlen, cutoff, dist)
+                     for _ in range(noc)]
+        ms.append(sum(len([x for x in d if x[1] == 0]) for d in durations))
+        fs.append(sum(len([x for x in d if x[1] == 1]) for d in durations))
+    loop = time.perf_counter() - start
+
+    start = time.perf_counter()
+    [_, m, f] = simulate_fleetwide_batch(dist, cutoff, noc, tlen, rept,
+                                         random_state=0)
+    batch = time.perf_counter() - start
+    report('Fleetwide', loop, batch, ms, fs, m, f)
+
+
+if __name__ == '__main__':
+    main(*[int(x) for x in sys.argv[1:3]])
@@ -0,0 +1,285 @@
+'''
+Benchmark suite of the numeric core, run without Streamlit. Every case is
+timed over parametrized problem sizes (best and mean of several repeats)
+and its peak traced memory is recorded. Results can be saved as a baseline
+JSON and later runs compared against it, flagging cases slower or larger
+than the baseline by more than a threshold.
+
+Usage:
+    python benchmarks/suite.py [-k pattern] [-r repeat] [--save out.json]
+                               [--compare baseline.json] [--threshold 1.25]
+
+Exits with status 1 when regressions are found in comparison mode.
+'''
+import argparse
+import itertools
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+from scipy.stats import exponweib
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+# Time the computations, not the on-disk result cache
+os.environ['RELIABILITY_CACHE'] = '0'
+from reliability import core  # noqa: E402
+from utils.cache import CACHES  # noqa: E402
+from utils.bootstrap import bootstrap_weibull  # noqa: E402
+from utils.fit import fit_weibull  # noqa: E402
+from utils.models import fit_models  # noqa: E402
+from utils.renewal import expected_counts  # noqa: E402
+from utils.sim import (  # noqa: E402
+    get_durations_fleetwide,
+    simulate_bycomponent,
+    simulate_bycomponent_batch,
+    simulate_fleetwide_batch
+)
+from utils.utils import (  # noqa: E402
+    calculate,
+    get_test_properties,
+    log_likelihood
+)
+
+
+INPUTS = {'oh': 5000, 'sfcost': 20000, 'mcost': 3000}
+
+
+def weibull(shape=1.5, scale=20000):
+    return exponweib(a=1, loc=0, c=shape, scale=scale)
+
+
+def clear_caches():
+    for func in CACHES.values():
+        func.cache_clear()
+
+
+def failure_data(rows, shape=1.5, cutoff=18000):
+    trials = weibull(shape).rvs(size=rows,
+                                random_state=np.random.default_rng(0))
+    return pd.DataFrame({'duration': np.minimum(trials, cutoff),
+                         'status': (trials <= cutoff).astype(np.int8)})
+
+
+def bench_simulate_bycomponent(noc, tlen):
+    dist = weibull()
+    return lambda: simulate_bycomponent(dist, 10000, noc, tlen)
+
+
+def bench_get_durations_fleetwide(noc, tlen):
+    dist = weibull()
+    return lambda: [get_durations_fleetwide(tlen, 10000, dist)
+                    for _ in range(noc)]
+
+
+def bench_simulate_bycomponent_batch(noc, rept, tlen):
+    dist = weibull()
+    return lambda: simulate_bycomponent_batch(dist, 10000, noc, tlen, rept,
+                                              random_state=0)
+
+
+def bench_simulate_fleetwide_batch(noc, rept, tlen):
+    dist = weibull()
+    return lambda: simulate_fleetwide_batch(dist, 10000, noc, tlen, rept,
+                                            random_state=0)
+
+
+def bench_calculate(shape):
+    dist = weibull(shape)
+
+    def run():
+        # Time the cold computation, not the memoized lookup
+        clear_caches()
+        calculate(dist, 10000, **INPUTS)
+    return run
+
+
+def bench_expected_counts(tlen):
+    dist = weibull()
+
+    def run():
+        clear_caches()
+        expected_counts(dist, 10000, 10, tlen)
+    return run
+
+
+def bench_log_likelihood(rows, shape):
+    df = failure_data(rows, shape)
+    return lambda: log_likelihood(df, exponweib, [shape, 20000])
+
+
+def bench_fit_weibull(rows, shape):
+    df = failure_data(rows, shape)
+    return lambda: fit_weibull(df['duration'].values, df['status'].values)
+
+
+def bench_load_failures(rows, binary):
+    # Files are left for the process lifetime in a temporary directory
+    directory = tempfile.mkdtemp()
+    df = failure_data(rows)
+    path = os.path.join(directory, 'data' + (core.EXTENSION if binary
+                                             else '.csv'))
+    if binary:
+        core.write_dataset(path, [df.to_dict('series')])
+    else:
+        df.to_csv(path, index=False)
+    return lambda: core.load_failures(path)
+
+
+def bench_bootstrap_weibull(rows, kind):
+    df = failure_data(rows)
+    return lambda: bootstrap_weibull(df['duration'].values,
+                                     df['status'].values, **INPUTS,
+                                     reps=100, kind=kind, seed=0)
+
+
+def bench_fit_models(rows):
+    df = failure_data(rows)
+    return lambda: fit_models(df['duration'].values, df['status'].values)
+
+
+def bench_get_test_properties(resolution):
+    return lambda: get_test_properties(0.05, 0.05, 1.5, 20000, 10,
+                                       resolution)
+
+
+def bench_sequential_test(rows):
+    # The data behind `plot_sequential_test`, whose charts need Streamlit
+    df = failure_data(rows, 1, 10**9)
+    chunks = [(df['duration'].values, df['status'].values)]
+
+    def run():
+        test = core.sequential_test(chunks, 0.05, 0.05, 1.5, 10**9,
+                                    keep=True)
+        test.cumulative()
+    return run
+
+
+# Benchmark cases and their parameter grids
+CASES = {
+    'simulate_bycomponent': (bench_simulate_bycomponent,
+                             {'noc': [1, 10], 'tlen': [15000, 150000]}),
+    'get_durations_fleetwide': (bench_get_durations_fleetwide,
+                                {'noc': [1, 10], 'tlen': [15000, 150000]}),
+    'simulate_bycomponent_batch': (bench_simulate_bycomponent_batch,
+                                   {'noc': [10], 'rept': [100, 2500],
+                                    'tlen': [15000, 150000]}),
+    'simulate_fleetwide_batch': (bench_simulate_fleetwide_batch,
+                                 {'noc': [10], 'rept': [100, 2500],
+                                  'tlen': [15000, 150000]}),
+    'calculate': (bench_calculate, {'shape': [0.8, 1.5, 3.0]}),
+    'expected_counts': (bench_expected_counts, {'tlen': [15000, 150000]}),
+    'log_likelihood': (bench_log_likelihood,
+                       {'rows': [10000, 1000000], 'shape': [0.8, 3.0]}),
+    'fit_weibull': (bench_fit_weibull,
+                    {'rows': [10000, 1000000], 'shape': [0.8, 3.0]}),
+    'bootstrap_weibull': (bench_bootstrap_weibull,
+                          {'rows': [10000, 100000],
+                           'kind': ['Nonparametric', 'Parametric']}),
+    'fit_models': (bench_fit_models, {'rows': [10000, 100000]}),
+    'load_failures': (bench_load_failures,
+                      {'rows': [10000, 1000000], 'binary': [False, True]}),
+    'get_test_properties': (bench_get_test_properties,
+                            {'resolution': [50, 5000]}),
+    'sequential_test': (bench_sequential_test, {'rows': [10000, 1000000]})
+}
+
+
+def expand(grid):
+    '''
+    Get every combination of the parameter grid as dictionaries
+    '''
+    keys = list(grid)
+    return [dict(zip(keys, x)) for x in itertools.product(*grid.values())]
+
+
+def case_name(name, params):
+    return name + '[' + ','.join(f'{k}={v}' for k, v in params.items()) + ']'
+
+
+def measure(run, repeat):
+    '''
+    Time `repeat` runs, then trace the peak memory of one more run
+    '''
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - start)
+    tracemalloc.start()
+    run()
+    (_, peak) = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {'min': min(times), 'mean': float(np.mean(times)), 'peak': peak}
+
+
+def run_suite(pattern='', repeat=3):
+    results = {}
+    for name, (setup, grid) in CASES.items():
+        if pattern not in name:
+            continue
+        for params in expand(grid):
+            key = case_name(name, params)
+            results[key] = measure(setup(**params), repeat)
+            r = results[key]
+            print(f'{key:60s} {r["min"]:10.4f}s {r["mean"]:10.4f}s '
+                  f'{r["peak"]/2**20:9.1f}MB', flush=True)
+    return results
+
+
+def compare(results, baseline, threshold=1.25):
+    '''
+    Compare results with a baseline, returning the cases whose best time
+    or peak memory grew by more than the threshold ratio
+    '''
+    regressions = []
+    print(f'\n{"case":60s} {"time":>8s} {"memory":>8s}')
+    for key, r in results.items():
+        if key not in baseline:
+            continue
+        b = baseline[key]
+        time_ratio = r['min']/b['min'] if b['min'] else 1.0
+        mem_ratio = r['peak']/b['peak'] if b['peak'] else 1.0
+        flag = time_ratio > threshold or mem_ratio > threshold
+        print(f'{key:60s} {time_ratio:7.2f}x {mem_ratio:7.2f}x'
+              f'{"  REGRESSION" if flag else ""}')
+        if flag:
+            regressions.append(key)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('-k', '--pattern', default='',
+                        help='Only run cases whose name contains this')
+    parser.add_argument('-r', '--repeat', type=int, default=3)
+    parser.add_argument('--save', help='Write the results as JSON')
+    parser.add_argument('--compare', help='Baseline JSON to compare with')
+    parser.add_argument('--threshold', type=float, default=1.25,
+                        help='Ratio to the baseline flagged as regression')
+    args = parser.parse_args(argv)
+
+    print(f'{"case":60s} {"best":>11s} {"mean":>11s} {"peak":>11s}')
+    results = run_suite(args.pattern, args.repeat)
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump({'python': platform.python_version(),
+                       'numpy': np.__version__,
+                       'results': results}, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)['results']
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f'\n{len(regressions)} regression(s)')
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,13 +1,36 @@
-import base64
-import io
-import pandas as pd
+import os
 from scipy.optimize import minimize
+from scipy.stats import exponweib
 import streamlit as st
+from reliability.core import (
+    BOOTSTRAPS,
+    MODELS,
+    bootstrap_weibull,
+    collect,
+    fit_models,
+    fit_weibull,
+    generate_censored,
+    load_failures,
+    submit_call
+)
+from utils.cache import memoize_dist
 from utils.io import img_to_bytes
-from utils.utils import (
-    floor_magnitude,
-    log_likelihood
+from utils.plotting import plot_bootstrap
+from utils.sections import (
+    download_section,
+    generation_section,
+    job_section
 )
+from utils.utils import log_likelihood
+
+
+@memoize_dist(maxsize=4)
+def generated_data(dist, **params):
+    '''
+    Generated toy data, kept for reruns with the same parameters and seed.
+    Shared by sessions, so never modified.
+    '''
+    return collect(generate_censored(dist, **params))
 
 
 def fitter(dist):
@@ -42,69 +65,50 @@ def fitter(dist):
     gu = st.radio('Generate toy data or upload?',
                   ['Upload', 'Generate'])
     if gu == 'Upload':
-        file_csv = st.file_uploader('''Upload a CSV file''',
-                                    type=['csv'])
+        file_csv = st.file_uploader('''Upload a CSV file or a binary
+                                    dataset''', type=['csv', 'rfd'])
     elif gu == 'Generate':
-        # Generation parameters
-        scale = st.number_input('Scale', 100, 1000000, 20000, 100)
-        shape = st.slider('Shape', 0.2, 5.0, 1.5, 0.01)
-        # Create distribution object
-        dgen = dist(a=1, loc=0, c=shape, scale=scale)
-
-        mag = floor_magnitude(dgen.ppf(0.99))
-        cutoff = st.slider('Maintenance Interval', int(mag*0.2),
-                           min([int(mag*10), 1000000]),
-                           int(mag*0.9), 100)
-
-        # Trials
-        rows = st.number_input('Rows to generate', 500, 10000, 2500, 100)
-        gbutton = st.button('Generate')
-        if gbutton:
-            tot = []
-            for _ in range(rows):
-                t = 0
-                trial = dgen.rvs()
-                if trial > cutoff:
-                    t += cutoff
-                    tot.append([cutoff, 0])
-                else:
-                    t += trial
-                    tot.append([trial, 1])
+        params, generate = generation_section(dist)
+        if generate:
+            df = generated_data(**params)
             # Automatic verification
             v = True
-            df = pd.DataFrame(tot, columns=['duration', 'status'])
-            csv = df.to_csv(index=False)
-
-            # Strings <-> bytes conversion
-            b64 = base64.b64encode(csv.encode()).decode()
-            href = '''<a href="data:file/csv;base64,{}"
-                download="{}">Download generated data</a>'''
-            filename = st.text_input('Filename (e.g. gen.csv)', 'gen.csv')
-
-            st.markdown(href.format(b64, filename), unsafe_allow_html=True)
+            download_section(df, 'Download generated data', 'gen')
 
     # If file is uploaded
     if file_csv:
-        encoded = file_csv.read().encode('utf8')
-        df = pd.read_csv(io.BytesIO(encoded))
-        df.columns = [x.lower() for x in df.columns]
-        if ('duration' in df.columns) and ('status' in df.columns):
+        try:
+            df, stats = load_failures(file_csv)
             st.write('First 5 rows of the data')
             st.write(df.head(5))
+            st.write(f'''{stats['rows']} rows with {stats['failures']}
+                     failures over {int(stats['total_time'])} hours''')
             v = st.checkbox('Verify?')
-        else:
-            st.error('''Failed to load data. Ensure column name
-            requirement is satisfied''')
+        except ValueError as e:
+            st.error(str(e))
 
     if v:
         st.subheader('Distribution Fitting')
         optimized = False
-        for method in ['BFGS', 'Nelder-Mead']:
+        methods = ['BFGS', 'Nelder-Mead']
+        if dist is exponweib:
+            # Closed-form gradient and Hessian for Weibull
+            methods = ['trust-exact'] + methods
+        for method in methods:
             with st.spinner(f'Optimizing with {method}'):
-                opt = minimize(lambda x: -log_likelihood(df, dist, x),
-                               x0=[1, df['duration'].mean()],
-                               method=method,
-                               options={'maxiter': 100})
+                if method == 'trust-exact':
+                    try:
+                        opt = fit_weibull(df['duration'].values,
+                                          df['status'].values)
+                    except ValueError as e:
+                        # No failures to fit
+                        st.error(str(e))
+                        return
+                else:
+                    opt = minimize(lambda x: -log_likelihood(df, dist, x),
+                                   x0=[1, df['duration'].mean()],
+                                   method=method,
+                                   options={'maxiter': 100})
                 if opt['success']:
                     nit = opt['nit']
                     opt = opt['x']
@@ -117,4 +121,62 @@ def fitter(dist):
             st.info(f'''Fitting successful, optimized with {method} in
                     {nit} iterations''')
             st.subheader('Parameters')
-            st.write(f'Scale: `{opt[0]:.2f}`\t Shape: `{int(opt[1])}`')
+            st.write(f'Shape: `{opt[0]:.2f}`\t Scale: `{int(opt[1])}`')
+
+        st.subheader('Model Selection')
+        models = st.multiselect('Compare distributions', list(MODELS),
+                                list(MODELS))
+        workers = st.number_input('Workers', 1, os.cpu_count() or 1,
+                                  min(len(MODELS), os.cpu_count() or 1))
+        if models and st.checkbox('Fit distributions'):
+            job = submit_call(f'Fitting {len(models)} distributions',
+                              fit_models, df['duration'].values,
+                              df['status'].values, models=models,
+                              workers=workers)
+            if not job_section(job, key='fits'):
+                return
+            fits = job.result
+            table = fits.drop(columns='params')
+            table.insert(0, 'parameters', [
+                ', '.join(f'{k}={x:.4g}' for k, x in
+                          zip(MODELS[name]['params'], params))
+                for name, params in fits['params'].items()
+            ])
+            st.write(table)
+            st.info(f'''Best by AIC: {fits.index[0]}, with Akaike weight
+                    {fits['akaike_weight'].iloc[0]:.2f}''')
+            failed = fits.index[~fits['success']]
+            if len(failed):
+                st.warning(f'Failed to converge: {", ".join(failed)}')
+
+        st.subheader('Uncertainty')
+        st.markdown('''Refit the Weibull to resampled data, and optimize the
+                    maintenance interval of every replicate, for confidence
+                    intervals of the parameters, the cost-optimal interval
+                    and its yearly cost''')
+        if st.checkbox('Bootstrap confidence intervals'):
+            kind = st.radio('Bootstrap', BOOTSTRAPS)
+            reps = st.number_input('Replicates', 100, 10000, 1000, 100)
+            level = st.slider('Confidence level', 0.80, 0.99, 0.95, 0.01)
+            oh = st.number_input('Yearly operational hours', 0, 8760, 5000)
+            sfcost = st.number_input('Failure Cost', 0, 100000, 20000)
+            mcost = st.number_input('Maintenance Cost', 0, 100000, 3000)
+            seed = st.number_input('Seed', 0, 2**31-1, 0)
+            job = submit_call(f'Bootstrap of {reps:,} replicates',
+                              bootstrap_weibull, df['duration'].values,
+                              df['status'].values, oh, sfcost, mcost,
+                              reps=reps, kind=kind, level=level, seed=seed,
+                              workers=workers)
+            if not job_section(job, key='bootstrap'):
+                return
+            boot = job.result
+            st.write(boot['intervals'])
+            if boot['failed']:
+                st.warning(f'''{boot['failed']} replicates failed to fit
+                           and are left out''')
+            if boot['run_to_failure']:
+                st.warning(f'''{boot['run_to_failure']} replicates run to
+                           failure, maintenance not paying, and are left
+                           out of the interval and cost''')
+            st.altair_chart(plot_bootstrap(boot['replicates'],
+                                           boot['intervals']))
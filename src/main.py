@@ -1,12 +1,21 @@
 import streamlit as st
-from scipy.stats import exponweib
+from reliability.core import (
+    DISTRIBUTIONS,
+    make_distribution
+)
 
 from home import home
 from fitter import fitter
 from maintenance import maintenance
 from simulation import simulation
 from validation import validation
-from utils.utils import floor_magnitude
+from utils import jobs, profiling
+from utils.cache import cache_stats
+from utils.sections import jobs_section, performance_section
+from utils.utils import (
+    floor_magnitude,
+    mean_life
+)
 
 
 st.sidebar.title('Reliability')
@@ -17,41 +26,57 @@ page = st.sidebar.radio('Page',
 pagedic = {'Home': home, 'Fitter': fitter, 'Maintenance': maintenance,
            'Simulation': simulation, 'Validation': validation}
 
-if page in ['Home', 'Validation']:
-    pagedic[page]()
-elif page in ['Fitter']:
-    dlist = {'weibull': exponweib}
-    d = st.sidebar.selectbox('Distribution', ['weibull'],
-                             0, lambda x: x.capitalize())
-    pagedic[page](dlist[d])
-elif page in ['Maintenance', 'Simulation']:
-    # List distributions
-    st.sidebar.subheader('Failure Process')
-    dlist = {'weibull': exponweib}
-    d = st.sidebar.selectbox('Distribution', ['weibull'],
-                             0, lambda x: x.capitalize())
-
-    # Trial parameters
-    scale = st.sidebar.number_input('Scale', 100, 1000000, 20000, 100)
-    shape = st.sidebar.slider('Shape', 0.2, 5.0, 1.5, 0.01)
-
-    # List sets of their respective parameters
-    params = {'weibull': {'c': shape, 'scale': scale}}
-
-    # Freeze distribution
-    dist = dlist[d](a=1, loc=0, **params[d])
-    st.sidebar.info(f'Characteristic Life is {int(dist.mean())} hours')
-
-    # Maintenance interval
-    st.sidebar.subheader('System')
-    mag = floor_magnitude(dist.ppf(0.99))
-    cutoff = st.sidebar.slider('Maintenance Interval', int(mag*0.2),
-                               min([int(mag*10), 1000000]), int(mag*0.9), 100)
-
-    noc = st.sidebar.number_input('Number of Components', 1, 1000, 10)
-    oh = st.sidebar.number_input('Operational Hours (Yearly)', 1, 24*366, 5000)
-    oh = oh*noc
-
-    inputs = {'oh': oh, 'cutoff': cutoff, 'noc': noc}
-
-    pagedic[page](dist, inputs)
+
+def run(page):
+    if page in ['Home', 'Validation']:
+        pagedic[page]()
+    elif page in ['Fitter']:
+        d = st.sidebar.selectbox('Distribution', ['weibull'],
+                                 0, lambda x: x.capitalize())
+        pagedic[page](DISTRIBUTIONS[d])
+    elif page in ['Maintenance', 'Simulation']:
+        # List distributions
+        st.sidebar.subheader('Failure Process')
+        d = st.sidebar.selectbox('Distribution', ['weibull'],
+                                 0, lambda x: x.capitalize())
+
+        # Trial parameters
+        scale = st.sidebar.number_input('Scale', 100, 1000000, 20000, 100)
+        shape = st.sidebar.slider('Shape', 0.2, 5.0, 1.5, 0.01)
+
+        # Freeze distribution
+        dist = make_distribution(d, shape, scale)
+        st.sidebar.info(
+            f'Characteristic Life is {int(mean_life(dist))} hours'
+        )
+
+        # Maintenance interval
+        st.sidebar.subheader('System')
+        mag = floor_magnitude(dist.ppf(0.99))
+        cutoff = st.sidebar.slider('Maintenance Interval', int(mag*0.2),
+                                   min([int(mag*10), 1000000]),
+                                   int(mag*0.9), 100)
+
+        noc = st.sidebar.number_input('Number of Components', 1, 1000, 10)
+        oh = st.sidebar.number_input('Operational Hours (Yearly)', 1,
+                                     24*366, 5000)
+        oh = oh*noc
+
+        inputs = {'oh': oh, 'cutoff': cutoff, 'noc': noc}
+
+        pagedic[page](dist, inputs)
+
+
+profile = st.sidebar.checkbox('Performance', profiling.is_enabled())
+# Timings of this run only, other sessions recording their own
+collector = profiling.Collector() if profile else None
+profile_text = None
+with profiling.collecting(collector):
+    if profile and st.sidebar.checkbox('cProfile'):
+        (_, profile_text) = profiling.profile(run, page)
+    else:
+        run(page)
+jobs_section(jobs.report())
+if profile:
+    performance_section(collector.report(), profile_text, cache_stats())
+    profiling.write_log(collector=collector, page=page)
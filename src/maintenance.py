@@ -1,13 +1,12 @@
 import numpy as np
-import pandas as pd
-from scipy.optimize import minimize
 import streamlit as st
+from reliability.core import maintenance_plan
 from utils.io import img_to_bytes
-from utils.utils import (
-    calculate,
-    cost_section
+from utils.sections import cost_section
+from utils.plotting import (
+    plot_cost_curve,
+    plot_distribution
 )
-from utils.plotting import plot_distribution
 
 
 def maintenance(dist, inputs):
@@ -32,43 +31,18 @@ def maintenance(dist, inputs):
     st.markdown('---')
     st.header('Comparison')
 
-    # Yearly statistics
-    out = calculate(dist, cutoff, **inputs)
-
-    # Add two fields, interval and cost
-    out['interval'] = {'maintenance': cutoff, 'no_maintenance': None}
-    out['mcost'] = {'maintenance':
-                    out['mcount']['maintenance']*inputs['mcost'],
-                    'no_maintenance': 0}
-
-    # Optimize by cost
+    # Yearly statistics and optimization by cost
     with st.spinner('Running optimization...'):
-        opt = minimize(lambda x: calculate(dist, x, cost=True, **inputs),
-                       cutoff, options={'maxiter': 30})
-        nit = opt['nit']
-        success = opt['success']
-        opt = opt['x'][0]
+        df, opt = maintenance_plan(dist, cutoff, inputs['oh'],
+                                   inputs['sfcost'], inputs['mcost'])
 
-    if success:
-        st.write('Optimized in {} iterations'.format(nit))
+    if opt['success']:
+        st.write('Optimized in {} cost evaluations'.format(opt['nfev']))
     else:
-        st.write('Failed to converge under 30 iterations allowed.')
-    # Produce dataframe
-    df = pd.DataFrame(out).T
-    df.columns = ['Maintenance', 'No Maintenance']
-    # Rearrange
-    df = df.loc[['interval', 'failures', 'mcount', 'fcost', 'mcost',
-                 'cost', 'mtbf'], :]
-
-    # Add cost-optimized values
-    co = pd.DataFrame(calculate(dist, opt, **inputs)).T['maintenance']
-    co['interval'] = opt
-    co['mcost'] = co['mcount']*inputs['mcost']
-    df['Cost-Optimized'] = co[['interval', 'failures', 'mcount', 'fcost',
-                               'mcost', 'cost', 'mtbf']].values
-
-    df.index = ['Interval', '# Failure', '# Maintenance', 'Failure Cost',
-                'Maintenance Cost', 'Cost', 'MTBF']
-    df = df.loc[:, ['No Maintenance', 'Maintenance', 'Cost-Optimized']]
+        st.write('''No cost-optimal interval found, cost keeps decreasing
+                 with longer intervals.''')
     st.write(np.round(df, 2))
     st.write('*Note: Shown are expected yearly figures*')
+
+    st.subheader('Cost Curve')
+    plot_cost_curve(opt['curve'], cutoff, opt['x'])
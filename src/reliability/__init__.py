@@ -0,0 +1,3 @@
+'''
+Headless reliability analysis, usable without Streamlit
+'''
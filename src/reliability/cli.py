@@ -0,0 +1,198 @@
+'''
+Command line entry point running maintenance optimization, simulation and
+validation from config files (JSON or TOML), e.g.
+
+    PYTHONPATH=src python -m reliability maintenance config.json
+'''
+import argparse
+import json
+import sys
+from pathlib import Path
+
+import pandas as pd
+from . import core
+
+
+def load_config(path):
+    '''
+    Load a JSON or TOML config file
+    '''
+    text = Path(path).read_text()
+    if str(path).endswith('.toml'):
+        import toml
+        return toml.loads(text)
+    return json.loads(text)
+
+
+def get_distribution(config):
+    return core.make_distribution(**config.get('distribution', {}))
+
+
+def run_maintenance(config):
+    dist = get_distribution(config)
+    noc = config.get('noc', 1)
+    df, opt = core.maintenance_plan(dist, config['cutoff'],
+                                    config['oh']*noc, config['sfcost'],
+                                    config['mcost'])
+    out = {'success': bool(opt['success']), 'interval': float(opt['x']),
+           'cost': float(opt['cost']),
+           'table': json.loads(df.to_json())}
+    return out, df
+
+
+def run_simulate(config):
+    dist = get_distribution(config)
+    noc = config.get('noc', 1)
+    # Trial length in hours, every component operating `oh` hours a year
+    tlen = config.get('years', 3)*config['oh']
+    if config.get('analytical'):
+        (summary, curve) = core.expected_trial(
+            dist, config['cutoff'], noc, tlen, config['sfcost'],
+            config['mcost'], mtype=config.get('mtype', 'Component-wise')
+        )
+        return summary.to_dict(orient='index'), curve
+    kwargs = {'mtype': config.get('mtype', 'Component-wise'),
+              'seed': config.get('seed'), 'workers': config.get('workers'),
+              'sampling': config.get('sampling', 'Plain')}
+    if config.get('target'):
+        sim = core.simulate_until(dist, config['cutoff'], noc, tlen,
+                                  config['sfcost'], config['mcost'],
+                                  target=config['target'],
+                                  metric=config.get('metric', 'Mean cost'),
+                                  q=config.get('quantile', 0.9),
+                                  max_rept=config.get('max_rept', 50000),
+                                  **kwargs)
+    else:
+        sim = core.simulate(dist, config['cutoff'], noc, tlen,
+                            config.get('rept', 2500), config['sfcost'],
+                            config['mcost'], **kwargs)
+    out = {x: core.summarize(sim[x]['count'])
+           for x in ['maintenances', 'failures', 'cost']}
+    out['estimate'] = sim['estimate']
+    if config.get('target'):
+        out['convergence'] = sim['history'].iloc[-1].to_dict()
+        out['converged'] = sim['converged']
+    if config.get('cutoffs'):
+        comparison = core.compare_cutoffs(
+            dist, config['cutoffs'], noc, tlen, config.get('rept', 2500),
+            config['sfcost'], config['mcost'],
+            mtype=config.get('mtype', 'Component-wise'),
+            seed=config.get('seed', 0), workers=config.get('workers'),
+            sampling=config.get('sampling', 'Plain')
+        )
+        out['comparison'] = comparison.to_dict(orient='records')
+    df = sim['maintenances'].join(sim['failures'], lsuffix='_maintenance',
+                                  rsuffix='_failure')
+    df['cost'] = sim['cost']['count']
+    return out, df.rename_axis('trial_id')
+
+
+def run_validate(config):
+    chunks = core.iter_failures(config['data'])
+    test = core.sequential_test(chunks, config['alpha'], config['beta'],
+                                config['d'], config['m0'])
+    out = {'decision': test.decision, 'index': test.index,
+           'rows_read': test.rows, 'duration': test.duration,
+           'failures': test.failures}
+    return out, None
+
+
+def run_fit(config):
+    (df, _) = core.load_failures(config['data'])
+    fits = core.fit_models(df['duration'].values, df['status'].values,
+                           models=config.get('models'),
+                           workers=config.get('workers', 1))
+    fits['params'] = [[float(x) for x in p] for p in fits['params']]
+    out = {'best': fits.index[0],
+           'table': json.loads(fits.to_json(orient='index'))}
+    return out, fits
+
+
+def run_bootstrap(config):
+    (df, _) = core.load_failures(config['data'])
+    noc = config.get('noc', 1)
+    boot = core.bootstrap_weibull(df['duration'].values,
+                                  df['status'].values, config['oh']*noc,
+                                  config['sfcost'], config['mcost'],
+                                  reps=config.get('reps', 1000),
+                                  kind=config.get('kind', 'Nonparametric'),
+                                  level=config.get('level', 0.95),
+                                  seed=config.get('seed'),
+                                  workers=config.get('workers', 1))
+    out = {'failed': boot['failed'],
+           'run_to_failure': boot['run_to_failure'],
+           'table': json.loads(boot['intervals'].to_json(orient='index'))}
+    return out, boot['replicates'].rename_axis('replicate')
+
+
+def run_fleet(config):
+    table = pd.read_csv(config['table'])
+    df = core.optimize_fleet(table, workers=config.get('workers', 1))
+    out = {'rows': len(df), 'optimized': int(df['success'].sum()),
+           'cost': float(df['cost'].sum()),
+           'failures': float(df['failures'].sum()),
+           'mcount': float(df['mcount'].sum())}
+    return out, df
+
+
+def run_generate(config, output):
+    if not output:
+        raise SystemExit('generate needs an output file, use -o')
+    chunks = core.generate_censored(get_distribution(config),
+                                    config['rows'],
+                                    config.get('scheme', 'Fixed cutoff'),
+                                    cutoff=config.get('cutoff'),
+                                    censor_mean=config.get('censor_mean'),
+                                    study_length=config.get('study_length'),
+                                    random_state=config.get('seed'))
+    if output.endswith(core.EXTENSION):
+        rows = core.write_dataset(output, ({'duration': d, 'status': s}
+                                           for (d, s) in chunks))
+    else:
+        rows = core.write_failure_data(output, chunks)
+    return {'rows': rows}, None
+
+
+def run_convert(config, output):
+    if not output:
+        raise SystemExit('convert needs an output file, use -o')
+    rows = core.convert_csv(config['data'], output,
+                            asset_id=config.get('asset_id'),
+                            timestamp=config.get('timestamp'))
+    return {'rows': rows}, None
+
+
+COMMANDS = {'maintenance': run_maintenance, 'simulate': run_simulate,
+            'validate': run_validate, 'fit': run_fit,
+            'bootstrap': run_bootstrap, 'fleet': run_fleet,
+            'generate': run_generate, 'convert': run_convert}
+# Commands writing their output file themselves, in chunks
+WRITERS = ['generate', 'convert']
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='reliability',
+        description='Run reliability analyses without the Streamlit app'
+    )
+    parser.add_argument('command', choices=list(COMMANDS))
+    parser.add_argument('config', help='JSON or TOML config file')
+    parser.add_argument('-o', '--output',
+                        help='''Write the detailed table to this CSV file, or
+                        the generated or converted data (a binary dataset
+                        with the .rfd extension)''')
+    args = parser.parse_args(argv)
+
+    config = load_config(args.config)
+    if args.command in WRITERS:
+        out, df = COMMANDS[args.command](config, args.output)
+    else:
+        out, df = COMMANDS[args.command](config)
+    if args.output and df is not None:
+        df.to_csv(args.output)
+    json.dump(out, sys.stdout, indent=2)
+    sys.stdout.write('\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,417 @@
+'''
+Headless API of the application. Nothing here imports Streamlit, so
+maintenance optimization, simulation and validation can be batch-run,
+profiled and cached outside the UI. The pages call into these functions.
+'''
+import numpy as np
+import pandas as pd
+from scipy.stats import exponweib
+
+from utils.bootstrap import BOOTSTRAPS, bootstrap_weibull  # noqa: F401
+from utils.data import (  # noqa: F401
+    collect,
+    generate_censored,
+    iter_failure_data,
+    read_failure_data,
+    write_failure_data
+)
+from utils.dataset import (  # noqa: F401
+    EXTENSION,
+    convert_csv,
+    iter_failures,
+    load_failures,
+    open_dataset,
+    write_dataset
+)
+from utils import jobs
+from utils.diskcache import disk_cache, make_key
+from utils.fit import fit_weibull  # noqa: F401
+from utils.fleet import optimize_fleet  # noqa: F401
+from utils.models import MODELS, fit_models  # noqa: F401
+from utils.renewal import expected_counts
+from utils.runner import (
+    estimate_mean,
+    estimate_quantile,
+    iter_simulation,
+    replicate_groups,
+    run_simulation
+)
+from utils.sim import SAMPLING, block_width  # noqa: F401
+from utils.sprt import (  # noqa: F401
+    SequentialTest,
+    oc_curves,
+    run_sequential_test
+)
+from utils.utils import (  # noqa: F401
+    calculate,
+    cost_curve,
+    log_likelihood,
+    mean_life,
+    optimize_interval
+)
+
+
+DISTRIBUTIONS = {'weibull': exponweib}
+# Targets of early-stopping simulation
+METRICS = ['Mean cost', 'Mean failures', 'Cost quantile']
+
+
+def make_distribution(name='weibull', shape=1.5, scale=20000):
+    '''
+    Freeze a failure distribution from its parameters
+    '''
+    params = {'weibull': {'c': shape, 'scale': scale}}
+    return DISTRIBUTIONS[name](a=1, loc=0, **params[name])
+
+
+@disk_cache()
+def maintenance_plan(dist, cutoff, oh, sfcost, mcost):
+    '''
+    Compare expected yearly figures without maintenance, with maintenance
+    at the cutoff and at the cost-optimized interval.
+
+    Returns the comparison table and the optimization result.
+    '''
+    inputs = {'oh': oh, 'sfcost': sfcost, 'mcost': mcost}
+    # Yearly statistics
+    out = calculate(dist, cutoff, **inputs)
+
+    # Add two fields, interval and cost
+    out['interval'] = {'maintenance': cutoff, 'no_maintenance': None}
+    out['mcost'] = {'maintenance':
+                    out['mcount']['maintenance']*mcost,
+                    'no_maintenance': 0}
+
+    # Optimize by cost
+    bounds = (dist.ppf(1e-4), dist.ppf(0.9999))
+    opt = optimize_interval(dist, bounds, **inputs)
+
+    # Produce dataframe
+    df = pd.DataFrame(out).T
+    df.columns = ['Maintenance', 'No Maintenance']
+    # Rearrange
+    df = df.loc[['interval', 'failures', 'mcount', 'fcost', 'mcost',
+                 'cost', 'mtbf'], :]
+
+    # Add cost-optimized values
+    co = pd.DataFrame(calculate(dist, opt['x'], **inputs)).T['maintenance']
+    co['interval'] = opt['x']
+    co['mcost'] = co['mcount']*mcost
+    df['Cost-Optimized'] = co[['interval', 'failures', 'mcount', 'fcost',
+                               'mcost', 'cost', 'mtbf']].values
+
+    df.index = ['Interval', '# Failure', '# Maintenance', 'Failure Cost',
+                'Maintenance Cost', 'Cost', 'MTBF']
+    df = df.loc[:, ['No Maintenance', 'Maintenance', 'Cost-Optimized']]
+    return df, opt
+
+
+def replay_simulate(out, arguments):
+    '''
+    Report a cached simulation as complete through its callback
+    '''
+    if arguments['callback']:
+        rept = len(out['cost'])
+        arguments['callback'](rept, rept)
+
+
+def replay_until(out, arguments):
+    '''
+    Report the running estimates of a cached simulation through its
+    callback, round by round
+    '''
+    if arguments['callback']:
+        for est in out['history'].to_dict(orient='records'):
+            arguments['callback'](est)
+
+
+@disk_cache(version=3, ignore=('workers', 'callback'), require=('seed',),
+            replay=replay_simulate)
+def simulate(dist, cutoff, noc, tlen, rept, sfcost, mcost,
+             mtype='Component-wise', seed=None, workers=None, keep=False,
+             callback=None, sampling='Plain', width=None):
+    '''
+    Simulate `rept` trials of `noc` components over `tlen` hours each, with
+    lifetimes drawn as given by `sampling` (see `utils.sim.SAMPLING`).
+
+    Returns a dictionary of total maintenance, failure and cost counts per
+    trial as DataFrames with a `count` column, the estimate of the mean cost
+    with its confidence interval and effective sample size, and the events
+    if `keep`.
+    '''
+    [events, ms, fs] = run_simulation(mtype, dist, cutoff, noc, tlen, rept,
+                                      seed=seed, workers=workers, keep=keep,
+                                      callback=callback, sampling=sampling,
+                                      width=width)
+    return trial_totals(events, ms, fs, sfcost, mcost, sampling)
+
+
+def trial_totals(events, ms, fs, sfcost, mcost, sampling='Plain'):
+    '''
+    Total the counts of simulated trials of shape (rept, noc) and estimate
+    the mean cost
+    '''
+    maintenances = pd.DataFrame(ms.sum(axis=1), columns=['count'])
+    failures = pd.DataFrame(fs.sum(axis=1), columns=['count'])
+    cost = mcost*maintenances + sfcost*failures
+    estimate = estimate_mean(cost['count'],
+                             replicate_groups(len(cost), sampling))
+    return {'events': events, 'maintenances': maintenances,
+            'failures': failures, 'cost': cost, 'estimate': estimate}
+
+
+def convergence(metric, cost, failures, groups, q=0.9, level=0.95):
+    '''
+    Estimate the target metric of simulated trials with its confidence
+    interval and relative error (half-width over the estimate)
+    '''
+    if metric == 'Cost quantile':
+        est = estimate_quantile(cost, q, level)
+        value = est['value']
+    elif metric in METRICS:
+        x = failures if metric == 'Mean failures' else cost
+        est = estimate_mean(x, groups, level)
+        value = est['mean']
+    else:
+        raise ValueError(f'Unknown metric {metric}')
+    half = (est['high'] - est['low'])/2
+    error = half/abs(value) if value else (0.0 if half == 0 else np.inf)
+    return {'rept': len(cost), 'value': value, 'low': est['low'],
+            'high': est['high'], 'error': error}
+
+
+@disk_cache(version=2, ignore=('workers', 'callback'), require=('seed',),
+            replay=replay_until)
+def simulate_until(dist, cutoff, noc, tlen, sfcost, mcost, target=0.01,
+                   metric='Mean cost', q=0.9, min_rept=500, max_rept=50000,
+                   mtype='Component-wise', seed=None, workers=None,
+                   keep=False, callback=None, sampling='Plain'):
+    '''
+    Simulate trials in rounds until the relative error of the metric (mean
+    cost, mean failures or the `q` quantile of cost) is within `target` at
+    95% confidence, with at least `min_rept` and at most `max_rept` trials.
+
+    `callback(estimate)` is called after every round with the running
+    estimate. Returns the output of `simulate`, with the running estimates
+    as `history` and whether the target was met as `converged`.
+    '''
+    rounds = iter_simulation(mtype, dist, cutoff, noc, tlen, max_rept,
+                             seed=seed, workers=workers, keep=keep,
+                             sampling=sampling)
+    parts = []
+    history = []
+    for part in rounds:
+        parts.append(part)
+        est = round_estimate(parts, sfcost, mcost, metric, q, sampling)
+        history.append(est)
+        if callback:
+            callback(est)
+        if est['rept'] >= min_rept and est['error'] <= target:
+            break
+    rounds.close()
+
+    out = trial_totals(*merge_rounds(parts, keep), sfcost, mcost, sampling)
+    out['history'] = pd.DataFrame(history)
+    out['converged'] = bool(history[-1]['error'] <= target)
+    return out
+
+
+def merge_rounds(parts, keep=False):
+    '''
+    Concatenate rounds of [events, maintenances, failures] from
+    `iter_simulation`
+    '''
+    ms = np.concatenate([x[1] for x in parts])
+    fs = np.concatenate([x[2] for x in parts])
+    events = None
+    if keep:
+        events = tuple(np.concatenate(x)
+                       for x in zip(*[part[0] for part in parts]))
+    return events, ms, fs
+
+
+def round_estimate(parts, sfcost, mcost, metric, q, sampling):
+    '''
+    Estimate the target metric of the rounds simulated so far
+    '''
+    (_, ms, fs) = merge_rounds(parts)
+    cost = mcost*ms.sum(axis=1) + sfcost*fs.sum(axis=1)
+    return convergence(metric, cost, fs.sum(axis=1),
+                       replicate_groups(len(cost), sampling), q)
+
+
+def simulation_steps(dist, cutoff, noc, tlen, rept, sfcost, mcost, mtype,
+                     seed, workers, keep, sampling, target, metric, q,
+                     min_rept):
+    '''
+    Steps of a background job simulating up to `rept` trials in rounds, as
+    `simulate` does, or as `simulate_until` does with a `target`. Rounds
+    are kept in the job data until it is done, so a cancelled job resumes
+    at its next chunk.
+    '''
+    def steps(job):
+        parts = job.data.setdefault('parts', [])
+        history = job.data.setdefault('history', [])
+        rounds = iter_simulation(mtype, dist, cutoff, noc, tlen, rept,
+                                 seed=seed, workers=workers, keep=keep,
+                                 sampling=sampling, start=job.done)
+        try:
+            for part in rounds:
+                parts.append(part)
+                job.done += len(part[1])
+                if target is not None:
+                    est = round_estimate(parts, sfcost, mcost, metric, q,
+                                         sampling)
+                    history.append(est)
+                    if job.done >= min_rept and est['error'] <= target:
+                        break
+                yield
+        finally:
+            rounds.close()
+        job.result = job_totals(job, sfcost, mcost, sampling)
+        # The rounds are only needed to resume, the result holds them now
+        del job.data['parts']
+        if target is not None:
+            job.result['history'] = pd.DataFrame(history)
+            job.result['converged'] = bool(history[-1]['error'] <= target)
+    return steps
+
+
+def job_totals(job, sfcost, mcost, sampling='Plain'):
+    '''
+    Totals of the trials a simulation job has run so far, as `simulate`
+    returns them, or None before its first round
+    '''
+    parts = list(job.data.get('parts', []))
+    if not parts:
+        return None
+    keep = parts[0][0] is not None
+    return trial_totals(*merge_rounds(parts, keep), sfcost, mcost, sampling)
+
+
+def submit_simulation(dist, cutoff, noc, tlen, rept, sfcost, mcost,
+                      mtype='Component-wise', seed=None, workers=None,
+                      keep=False, sampling='Plain', target=None,
+                      metric='Mean cost', q=0.9, min_rept=500, start=True):
+    '''
+    Run a simulation of up to `rept` trials as a background job (see
+    `utils.jobs`), stopping early at a `target` relative error of the
+    metric as `simulate_until` does. A seeded simulation is shared with any
+    session asking for the same one. Without `start`, only an existing job
+    is looked up.
+
+    Returns the job, or None. Once done, its `result` is the output of
+    `simulate`, with `history` and `converged` given a target.
+    '''
+    arguments = {k: v for k, v in locals().items()
+                 if k not in ['workers', 'start']}
+    key = None if seed is None else make_key('simulation', 1, arguments)
+    if not start:
+        return jobs.get(key) if key else None
+    steps = simulation_steps(dist, cutoff, noc, tlen, rept, sfcost, mcost,
+                             mtype, seed, workers, keep, sampling, target,
+                             metric, q, min_rept)
+    label = f'Simulation of {rept:,} trials at cutoff {cutoff:,.0f}'
+    return jobs.submit(key, steps, rept, label)
+
+
+def submit_call(label, func, *args, start=True, **kwargs):
+    '''
+    Run a function as a background job, shared with any session calling it
+    with the same arguments (the number of workers aside). Without
+    `start`, only an existing job is looked up. Returns the job, or None.
+    '''
+    name = f'{func.__module__}.{func.__qualname__}'
+    key = make_key(name, 1, (args, {k: v for k, v in kwargs.items()
+                                    if k != 'workers'}))
+    if not start:
+        return jobs.get(key)
+    return jobs.submit(key, jobs.call_steps(func, *args, **kwargs), 1, label)
+
+
+@disk_cache(version=3, ignore=('workers',), require=('seed',))
+def compare_cutoffs(dist, cutoffs, noc, tlen, rept, sfcost, mcost,
+                    mtype='Component-wise', seed=0, workers=None,
+                    sampling='Plain'):
+    '''
+    Simulate candidate cutoffs with common random numbers: every cutoff
+    reuses the same seed and lifetime draws, so the differences in cost are
+    far less noisy than the costs themselves.
+
+    Returns a DataFrame of the mean cost of each cutoff and its difference to
+    the first cutoff, with their confidence intervals.
+    '''
+    cutoffs = sorted(cutoffs)
+    # Draw as many lifetimes for every cutoff as the shortest one needs
+    width = block_width(dist, cutoffs[0], tlen)
+    groups = replicate_groups(rept, sampling)
+    rows = []
+    base = None
+    for cutoff in cutoffs:
+        sim = simulate(dist, cutoff, noc, tlen, rept, sfcost, mcost,
+                       mtype=mtype, seed=seed, workers=workers,
+                       sampling=sampling, width=width)
+        cost = sim['cost']['count'].values
+        base = cost if base is None else base
+        diff = estimate_mean(cost - base, groups)
+        rows.append({'cutoff': cutoff, 'cost': sim['estimate']['mean'],
+                     'cost_low': sim['estimate']['low'],
+                     'cost_high': sim['estimate']['high'],
+                     'difference': diff['mean'],
+                     'difference_low': diff['low'],
+                     'difference_high': diff['high']})
+    return pd.DataFrame(rows)
+
+
+def expected_trial(dist, cutoff, noc, tlen, sfcost, mcost,
+                   mtype='Component-wise'):
+    '''
+    Expected maintenances, failures and cost of a trial of `noc` components
+    over `tlen` hours each from the renewal equation, without simulation.
+
+    Returns a summary table of their means and standard deviations, and the
+    expected counts and cost over time.
+    '''
+    (total, curve) = expected_counts(dist, cutoff, noc, tlen, mtype)
+    curve['cost'] = mcost*curve['maintenances'] + sfcost*curve['failures']
+    cost_var = (mcost**2*total['maintenances_var'] +
+                sfcost**2*total['failures_var'] +
+                2*mcost*sfcost*total['covariance'])
+    summary = pd.DataFrame({
+        'mean': [total['maintenances'], total['failures'],
+                 mcost*total['maintenances'] + sfcost*total['failures']],
+        'std': np.sqrt(np.maximum([total['maintenances_var'],
+                                   total['failures_var'], cost_var], 0))
+    }, index=['maintenances', 'failures', 'cost'])
+    return summary, curve
+
+
+def test_bounds(alpha, beta, d):
+    '''
+    Get the accept and reject boundaries (B, A) of a test plan
+    '''
+    correction_factor = (d+1)/(2*d)
+    ub = (1-beta)/alpha*correction_factor
+    lb = beta/(1-alpha)
+    return lb, ub
+
+
+def sequential_test(chunks, alpha, beta, d, m0, keep=False):
+    '''
+    Run the SPRT of a test plan over chunks of (durations, status), stopping
+    at the decision row
+    '''
+    (lb, ub) = test_bounds(alpha, beta, d)
+    test = SequentialTest(lb, ub, d, m0, keep=keep)
+    return run_sequential_test(test, chunks)
+
+
+def summarize(counts, quantiles=(0.05, 0.5, 0.95)):
+    '''
+    Summarize simulated counts by their mean, standard deviation and
+    quantiles
+    '''
+    x = np.asarray(counts, dtype=float).ravel()
+    out = {'mean': x.mean(), 'std': x.std(ddof=1) if x.size > 1 else 0.0}
+    out.update({f'q{int(q*100)}': np.quantile(x, q) for q in quantiles})
+    return {k: float(v) for k, v in out.items()}
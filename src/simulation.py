@@ -1,13 +1,27 @@
-import base64
+import os
 import pandas as pd
 import streamlit as st
+from reliability.core import (
+    METRICS,
+    compare_cutoffs,
+    expected_trial,
+    job_totals,
+    simulate,
+    simulate_until,
+    submit_simulation
+)
 from utils.io import img_to_bytes
-from utils.plotting import plot_uncertainty_chart
-from utils.sim import (
-    get_durations_fleetwide,
-    simulate_bycomponent
+from utils.plotting import (
+    plot_convergence,
+    plot_expected_counts,
+    plot_uncertainty_chart
+)
+from utils.sections import (
+    cost_section,
+    download_section,
+    job_section
 )
-from utils.utils import cost_section
+from utils.sim import SAMPLING, events_to_frame, has_sobol
 
 
 def simulation(dist, inputs):
@@ -32,64 +46,165 @@ def simulation(dist, inputs):
     st.markdown('---')
     st.header('Trials')
     tl = st.slider('Length of Trials (in years)', 0.5, 10.0, 3.0, 0.1)
-    rept = st.number_input('Repeat', 100, 10000, 2500)
+    stopping = st.radio('Stopping', ['Fixed repeats', 'Convergence target'])
+    if stopping == 'Fixed repeats':
+        rept = st.number_input('Repeat', 100, 10000, 2500)
+    else:
+        metric = st.selectbox('Target Metric', METRICS)
+        q = 0.9
+        if metric == 'Cost quantile':
+            q = st.slider('Quantile', 0.5, 0.99, 0.9, 0.01)
+        target = st.number_input('Target Relative Error (%)', 0.1, 20.0,
+                                 1.0, 0.1)
+        max_rept = st.number_input('Maximum Repeat', 1000, 100000, 20000)
+    seed = st.number_input('Random Seed', 0, 2**31-1, 0)
+    workers = st.number_input('Workers', 1, os.cpu_count() or 1,
+                              os.cpu_count() or 1)
+    sampling = st.radio('Sampling', [x for x in SAMPLING
+                                     if x != 'Sobol' or has_sobol()])
+    st.markdown('''Antithetic pairs of trials and stratified draws (Latin
+                hypercube, Sobol) reach the precision of plain sampling with
+                fewer trials. Stratified intervals are estimated across
+                chunks of 250 trials.''')
+    candidates = st.text_input('Compare Cutoffs (comma-separated hours)', '')
+    analytical = st.checkbox('Analytical only (skip Monte Carlo)')
     # Convert trial length to hours per component
     tlen = tl*oh/noc
 
+    background = st.checkbox('Run in background', True)
+    st.markdown('''Background simulations carry on through widget changes
+                and are shared by sessions with the same inputs and seed.
+                They can be cancelled and resumed by chunks of trials.''')
+
     btn = st.button('Simulate')
-    if btn:
+    job = None
+    if background and not analytical:
+        kwargs = {}
+        if stopping == 'Convergence target':
+            (rept, kwargs) = (max_rept, {'target': target/100,
+                                         'metric': metric, 'q': q})
+        job = submit_simulation(dist, cutoff, noc, tlen, rept,
+                                inputs['sfcost'], inputs['mcost'],
+                                mtype=mtype, seed=seed, workers=workers,
+                                keep=True, sampling=sampling, start=btn,
+                                **kwargs)
+    if not btn and job is None:
+        return
+
+    (expected, curve) = expected_trial(dist, cutoff, noc, tlen,
+                                       inputs['sfcost'], inputs['mcost'],
+                                       mtype=mtype)
+    st.markdown('---')
+    st.header('Expected Trial')
+    st.markdown('''Expected counts and cost of a trial from the renewal
+                equation, with their standard deviations''')
+    st.table(expected)
+    st.altair_chart(plot_expected_counts(curve))
+    if analytical:
+        return
+
+    if stopping == 'Convergence target':
+        status = st.empty()
+        chart = st.empty()
+
+        def show(est, history):
+            status.markdown(f'''{est['rept']:,} trials: {metric.lower()}
+                            {est['value']:,.2f}, 95% confidence interval
+                            [{est['low']:,.2f}, {est['high']:,.2f}],
+                            relative error {est['error']:.2%}''')
+            chart.altair_chart(plot_convergence(pd.DataFrame(history),
+                                                metric))
+
+    if job is not None:
+        st.markdown('---')
+        st.header('Progress')
+        partial = st.empty()
+
+        def poll(job):
+            history = list(job.data.get('history', []))
+            if history:
+                show(history[-1], history)
+            elif stopping == 'Fixed repeats' and job.active:
+                totals = job_totals(job, inputs['sfcost'], inputs['mcost'],
+                                    sampling)
+                if totals is not None:
+                    est = totals['estimate']
+                    partial.markdown(f'''Mean cost so far:
+                                     **{est['mean']:,.0f}**, 95% confidence
+                                     interval [{est['low']:,.0f},
+                                     {est['high']:,.0f}]''')
+
+        if not job_section(job, poll, 'simulation'):
+            return
+        sim = job.result
+        if stopping == 'Convergence target':
+            rept = len(sim['cost'])
+            if not sim['converged']:
+                st.warning(f'''Target not met within {max_rept:,}
+                           trials''')
+    elif stopping == 'Fixed repeats':
         p = st.progress(0)
-        trials = []
-        ms = []
-        fs = []
-        for i in range(rept):
-            if mtype == 'Component-wise':
-                [trial, m, f] = simulate_bycomponent(dist, cutoff, noc, tlen)
-                trials.append(trial)
-                ms.append(m)
-                fs.append(f)
-            elif mtype == 'Fleetwide':
-                f = []
-                m = []
-                tr = []
-                for _ in range(noc):
-                    durations = get_durations_fleetwide(tlen, cutoff, dist)
-                    tr.append(durations)
-                    f.append(len([x[0] for x in durations if x[1] == 1]))
-                    m.append(len([x[0] for x in durations if x[1] == 0]))
-                trials.append(tr)
-                fs.append(f)
-                ms.append(m)
-            p.progress(int((i+1)*100/rept))
-        df = pd.DataFrame(trials).rename_axis('trial_id')
-        df.columns = ['component_'+str(x+1) for x in df.columns]
-        csv = df.to_csv()
-
-        maintenances = pd.DataFrame([sum(x) for x in ms],
-                                    columns=['count'])
-        failures = pd.DataFrame([sum(x) for x in fs], columns=['count'])
-
-        # Strings <-> bytes conversion
-        b64 = base64.b64encode(csv.encode()).decode()
-        href = '''<a href="data:file/csv;base64,{}"
-            download="{}">Download trials</a>'''
-        filename = st.text_input('Filename (e.g. data.csv)', 'data.csv')
-
-        st.markdown(href.format(b64, filename), unsafe_allow_html=True)
+        sim = simulate(
+            dist, cutoff, noc, tlen, rept, inputs['sfcost'],
+            inputs['mcost'], mtype=mtype, seed=seed, workers=workers,
+            keep=True,
+            callback=lambda done, n: p.progress(int(done*100/n)),
+            sampling=sampling
+        )
+    else:
+        history = []
+
+        def callback(est):
+            history.append(est)
+            show(est, history)
+
+        sim = simulate_until(
+            dist, cutoff, noc, tlen, inputs['sfcost'], inputs['mcost'],
+            target=target/100, metric=metric, q=q, max_rept=max_rept,
+            mtype=mtype, seed=seed, workers=workers, keep=True,
+            callback=callback, sampling=sampling
+        )
+        rept = len(sim['cost'])
+        if not sim['converged']:
+            st.warning(f'''Target not met within {max_rept:,}
+                       trials''')
+    est = sim['estimate']
+    st.markdown(f'''Mean cost: **{est['mean']:,.0f}**, 95% confidence
+                interval [{est['low']:,.0f}, {est['high']:,.0f}],
+                effective sample size {est['ess']:,.0f}''')
+    trials = events_to_frame(sim['events'], noc)
+    download_section(trials, 'Download trials', 'trials')
+
+    st.markdown('---')
+    st.header('Uncertainty')
+
+    mfig = plot_uncertainty_chart(
+        sim['maintenances'], expected.loc['maintenances', 'mean']
+        ).properties(
+        title='Maintenance Count Distribution'
+        )
+    ffig = plot_uncertainty_chart(
+        sim['failures'], expected.loc['failures', 'mean']
+        ).properties(
+        title='Failure Count Distribution'
+        )
+    st.markdown(f'Over {noc} components and trial length of {tl} years:')
+
+    cfig = plot_uncertainty_chart(
+        sim['cost'], expected.loc['cost', 'mean']
+        ).properties(
+        title='Cost Distribution'
+        )
+    st.altair_chart(mfig | ffig | cfig)
 
+    if candidates.strip():
         st.markdown('---')
-        st.header('Uncertainty')
-
-        mfig = plot_uncertainty_chart(maintenances).properties(
-            title='Maintenance Count Distribution'
-            )
-        ffig = plot_uncertainty_chart(failures).properties(
-            title='Failure Count Distribution'
-            )
-        st.markdown(f'Over {noc} components and trial length of {tl} years:')
-
-        cost = inputs['mcost']*maintenances + inputs['sfcost']*failures
-        cfig = plot_uncertainty_chart(cost).properties(
-            title='Cost Distribution'
-            )
-        st.altair_chart(mfig | ffig | cfig)
+        st.header('Cutoff Comparison')
+        st.markdown('''Candidate cutoffs are simulated with common
+                    random numbers, the difference being to the
+                    shortest cutoff''')
+        cutoffs = [float(x) for x in candidates.split(',') if x.strip()]
+        st.table(compare_cutoffs(dist, cutoffs, noc, tlen, rept,
+                                 inputs['sfcost'], inputs['mcost'],
+                                 mtype=mtype, seed=seed, workers=workers,
+                                 sampling=sampling))
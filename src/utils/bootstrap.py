@@ -0,0 +1,155 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from .diskcache import disk_cache
+from .fit import weibull_mle
+from .fleet import optimize_chunk
+from .profiling import timed
+
+
+# Resampling schemes: rows drawn with replacement from the data, or new
+# lifetimes drawn from the fitted Weibull under the observed censoring
+BOOTSTRAPS = ['Nonparametric', 'Parametric']
+# Replicates per task, bounding the memory of the resampled arrays
+CHUNK = 50
+# Estimates reported with confidence intervals
+ESTIMATES = ['shape', 'scale', 'interval', 'cost']
+
+
+def resample_counts(n, reps, rng):
+    '''
+    Times each of `n` rows is drawn in `reps` resamples with replacement,
+    as a (reps, n) array of multinomial counts from one vectorized draw
+    '''
+    idx = rng.integers(0, n, size=(reps, n))
+    idx += np.arange(reps)[:, None]*n
+    return np.bincount(idx.ravel(), minlength=reps*n).reshape(reps, n)
+
+
+def censoring_times(durations, status, reps, rng):
+    '''
+    Censoring times of every row for `reps` parametric resamples. Censored
+    rows keep their own. A failed row was censored later than its failure,
+    so it gets one of the observed censoring times beyond its failure,
+    drawn uniformly, or none when there is no such time.
+    '''
+    failed = status > 0
+    cs = np.sort(durations[~failed])
+    out = np.broadcast_to(np.where(failed, np.inf, durations),
+                          (reps, len(durations))).copy()
+    first = np.searchsorted(cs, durations[failed], side='right')
+    later = len(cs) - first
+    u = rng.random((reps, len(first)))
+    pick = np.minimum(first + (u*later).astype(int), len(cs)-1)
+    out[:, failed] = np.where(later > 0, cs[pick] if len(cs) else np.inf,
+                              np.inf)
+    return out
+
+
+def bootstrap_chunk(kind, durations, status, x0, reps, seed, inputs):
+    '''
+    Refit `reps` resamples of the data from the point estimate `x0`, then
+    optimize the maintenance interval of every replicate at once. Returns
+    an array of shape, scale, interval, yearly cost, fit success and
+    optimizer success by replicate, the interval and cost being NaN where
+    maintenance does not pay.
+    '''
+    rng = np.random.default_rng(seed)
+    params = np.full((reps, 2), np.nan)
+    success = np.zeros(reps, dtype=bool)
+    if kind == 'Nonparametric':
+        counts = resample_counts(len(durations), reps, rng)
+    else:
+        censor = censoring_times(durations, status, reps, rng)
+        lifetimes = x0[1]*rng.weibull(x0[0], size=censor.shape)
+    for i in range(reps):
+        if kind == 'Nonparametric':
+            # Rows not drawn do not count
+            drawn = counts[i] > 0
+            (d, s, w) = (durations[drawn], status[drawn], counts[i][drawn])
+        else:
+            d = np.minimum(lifetimes[i], censor[i])
+            s = (lifetimes[i] <= censor[i]).astype(float)
+            w = None
+        try:
+            opt = weibull_mle(d, s, x0=x0, weights=w)
+        except ValueError:
+            # No failures in the resample
+            continue
+        params[i] = opt['x']
+        success[i] = opt['success']
+
+    table = pd.DataFrame({'shape': params[:, 0], 'scale': params[:, 1],
+                          **inputs})
+    out = optimize_chunk(table[success])
+    optimized = np.zeros(reps, dtype=bool)
+    optimized[success] = out['success'].values
+    interval = np.full(reps, np.nan)
+    cost = np.full(reps, np.nan)
+    # Replicates running to failure have no optimal interval
+    interval[optimized] = out.loc[out['success'], 'interval'].values
+    cost[optimized] = out.loc[out['success'], 'cost'].values
+    return np.column_stack([params, interval, cost, success, optimized])
+
+
+def _bootstrap_chunk(args):
+    return bootstrap_chunk(*args)
+
+
+@timed()
+@disk_cache(version=2, ignore=('workers',), require=('seed',))
+def bootstrap_weibull(durations, status, oh, sfcost, mcost, reps=1000,
+                      kind='Nonparametric', level=0.95, seed=None,
+                      workers=1, chunk=CHUNK):
+    '''
+    Bootstrap the Weibull fit of censored data and the cost-optimized
+    maintenance interval it implies. Replicates are resampled as given by
+    `kind` (see `BOOTSTRAPS`) in chunks across a process pool, each chunk
+    seeded with its own child of `SeedSequence(seed)`, and each replicate
+    is propagated through the interval optimizer of `optimize_fleet` with
+    `oh` yearly operational hours.
+
+    Returns a dictionary of the replicates as a DataFrame, the percentile
+    confidence intervals of `ESTIMATES` at `level` around the point
+    estimates, the number of replicates that failed to fit, and the number
+    of fitted replicates left out of the interval and cost as maintenance
+    does not pay for them.
+    '''
+    if kind not in BOOTSTRAPS:
+        raise ValueError(f'Unknown bootstrap: {kind}')
+    durations = np.asarray(durations, dtype=float)
+    status = np.asarray(status, dtype=float)
+    inputs = {'oh': oh, 'sfcost': sfcost, 'mcost': mcost}
+    x0 = weibull_mle(durations, status)['x']
+    point = optimize_chunk(pd.DataFrame({'shape': [x0[0]],
+                                         'scale': [x0[1]], **inputs}))
+
+    sizes = [min(chunk, reps-i) for i in range(0, reps, chunk)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    tasks = [(kind, durations, status, x0, n, s, inputs)
+             for n, s in zip(sizes, seeds)]
+    workers = min(workers or os.cpu_count() or 1, len(tasks))
+    if workers <= 1:
+        results = [_bootstrap_chunk(x) for x in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(_bootstrap_chunk, tasks))
+
+    replicates = pd.DataFrame(np.concatenate(results),
+                              columns=ESTIMATES + ['success', 'optimized'])
+    for x in ['success', 'optimized']:
+        replicates[x] = replicates[x].astype(bool)
+    # Interval and cost are NaN, hence skipped, for unoptimized replicates
+    fitted = replicates[replicates['success']]
+    alpha = (1-level)/2
+    intervals = pd.DataFrame({
+        'estimate': [x0[0], x0[1], point['interval'].iloc[0],
+                     point['cost'].iloc[0]],
+        'low': [fitted[x].quantile(alpha) for x in ESTIMATES],
+        'high': [fitted[x].quantile(1-alpha) for x in ESTIMATES]
+    }, index=ESTIMATES)
+    return {'replicates': replicates, 'intervals': intervals,
+            'failed': int((~replicates['success']).sum()),
+            'run_to_failure': int((~fitted['optimized']).sum())}
@@ -0,0 +1,90 @@
+import threading
+from collections import OrderedDict, namedtuple
+from functools import wraps
+
+import numpy as np
+
+
+CacheInfo = namedtuple('CacheInfo', ['hits', 'misses', 'maxsize', 'currsize'])
+
+# Memoized functions by name, to report their counters
+CACHES = {}
+
+
+def dist_key(dist):
+    '''
+    Hashable key of a frozen distribution as (family, shape parameters,
+    scale, loc)
+    '''
+    shapes = [x for x in (dist.dist.shapes or '').split(', ') if x]
+    kwds = dict(zip(shapes + ['loc', 'scale'], dist.args))
+    kwds.update(dist.kwds)
+    return (dist.dist.name, tuple(float(kwds[x]) for x in shapes),
+            float(kwds.get('scale', 1)), float(kwds.get('loc', 0)))
+
+
+def value_key(x):
+    '''
+    Hashable key of a scalar or an array of cutoffs
+    '''
+    if x is None:
+        return None
+    if np.ndim(x) == 0:
+        return float(x)
+    x = np.asarray(x, dtype=float)
+    return (x.shape, x.tobytes())
+
+
+def memoize_dist(maxsize=256):
+    '''
+    Bounded LRU memoization of `func(dist, *args)` keyed on the frozen
+    distribution parameters and the arguments, usually the cutoff. Counters
+    are available through `func.cache_info()`, as with `functools.lru_cache`.
+    '''
+    def decorator(func):
+        cache = OrderedDict()
+        lock = threading.Lock()
+        stats = {'hits': 0, 'misses': 0}
+
+        @wraps(func)
+        def wrapper(dist, *args, **kwargs):
+            key = (dist_key(dist), tuple(value_key(x) for x in args),
+                   tuple(sorted(kwargs.items())))
+            with lock:
+                if key in cache:
+                    stats['hits'] += 1
+                    cache.move_to_end(key)
+                    return cache[key]
+                stats['misses'] += 1
+            out = func(dist, *args, **kwargs)
+            if isinstance(out, np.ndarray):
+                out.setflags(write=False)
+            with lock:
+                cache[key] = out
+                if len(cache) > maxsize:
+                    cache.popitem(last=False)
+            return out
+
+        def cache_info():
+            with lock:
+                return CacheInfo(stats['hits'], stats['misses'], maxsize,
+                                 len(cache))
+
+        def cache_clear():
+            with lock:
+                cache.clear()
+                stats['hits'] = stats['misses'] = 0
+
+        wrapper.cache_info = cache_info
+        wrapper.cache_clear = cache_clear
+        CACHES[func.__name__] = wrapper
+        return wrapper
+    return decorator
+
+
+def cache_stats():
+    '''
+    Get the counters of all memoized functions as a dictionary
+    '''
+    return {name: func.cache_info()._asdict()
+            for name, func in CACHES.items()}
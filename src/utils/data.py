@@ -0,0 +1,151 @@
+import numbers
+
+import numpy as np
+import pandas as pd
+from .profiling import timed
+
+
+COLUMNS = ['duration', 'status']
+# Rows read per chunk when streaming failure data
+CHUNKSIZE = 100000
+# Censoring schemes of generated failure data
+SCHEMES = ['Fixed cutoff', 'Random censoring', 'Staggered entry']
+
+
+def check_values(durations, status):
+    '''
+    Validate arrays of failure durations and censoring indicators
+    '''
+    if not np.all(np.isfinite(durations)) or np.any(durations < 0):
+        raise ValueError('Field `duration` should be non-negative numbers')
+    if not np.all(np.isin(status, [0, 1])):
+        raise ValueError('Field `status` should only contain 0 or 1')
+
+
+def check_chunk(df):
+    '''
+    Validate a chunk of failure data and convert it to compact arrays
+    '''
+    if not set(COLUMNS).issubset(df.columns):
+        raise ValueError('''Failed to load data. Ensure column name
+        requirement is satisfied''')
+    durations = pd.to_numeric(df['duration'], errors='coerce').values
+    status = pd.to_numeric(df['status'], errors='coerce').values
+    check_values(durations, status)
+    return durations.astype(np.float64), status.astype(np.int8)
+
+
+def iter_failure_data(file, chunksize=CHUNKSIZE):
+    '''
+    Stream failure data from a CSV file or buffer in chunks, keeping only the
+    `duration` and `status` fields (case-insensitive). Yields validated
+    (durations, status) arrays as float64 and int8.
+    '''
+    reader = pd.read_csv(file, chunksize=chunksize,
+                         usecols=lambda x: x.strip().lower() in COLUMNS)
+    for df in reader:
+        df.columns = [x.strip().lower() for x in df.columns]
+        yield check_chunk(df)
+
+
+def init_stats():
+    '''
+    Initialize the sufficient statistics of failure data
+    '''
+    return {'rows': 0, 'failures': 0, 'total_time': 0.0,
+            'log_failure_time': 0.0}
+
+
+def update_stats(stats, durations, status):
+    '''
+    Update the sufficient statistics with a chunk of failure data: failure
+    count and total time (exponential likelihood and SPRT), and the sum of
+    log failure times (Weibull likelihood)
+    '''
+    failed = status == 1
+    stats['rows'] += len(durations)
+    stats['failures'] += int(np.count_nonzero(failed))
+    stats['total_time'] += float(np.sum(durations))
+    stats['log_failure_time'] += float(np.sum(np.log(durations[failed])))
+    return stats
+
+
+@timed()
+def read_failure_data(file, chunksize=CHUNKSIZE):
+    '''
+    Read failure data in chunks, computing its sufficient statistics along
+    the way. Returns a DataFrame of `duration` and `status` with compact
+    dtypes, and the statistics.
+    '''
+    stats = init_stats()
+    chunks = []
+    for (durations, status) in iter_failure_data(file, chunksize):
+        update_stats(stats, durations, status)
+        chunks.append((durations, status))
+    if not chunks:
+        raise ValueError('Failed to load data. The file has no rows')
+    (durations, status) = [np.concatenate(x) for x in zip(*chunks)]
+    df = pd.DataFrame({'duration': durations, 'status': status})
+    return df, stats
+
+
+def generate_censored(dist, rows, scheme='Fixed cutoff', cutoff=None,
+                      censor_mean=None, study_length=None,
+                      random_state=None, chunksize=CHUNKSIZE):
+    '''
+    Generate censored failure data in chunks of (durations, status), with
+    failure times drawn from the distribution and censoring times given by
+    the scheme:
+
+       1. `Fixed cutoff`: censored at the cutoff (maintenance interval)
+       2. `Random censoring`: censored at exponential times of mean
+       `censor_mean`
+       3. `Staggered entry`: entering uniformly within a study of
+       `study_length` hours, censored at the end of the study
+    '''
+    if scheme not in SCHEMES:
+        raise ValueError(f'Unknown censoring scheme {scheme}')
+    # Parameter each scheme needs, as a positive number
+    (name, value) = {'Fixed cutoff': ('cutoff', cutoff),
+                     'Random censoring': ('censor_mean', censor_mean),
+                     'Staggered entry': ('study_length', study_length)
+                     }[scheme]
+    if value is None:
+        raise ValueError(f'Censoring scheme {scheme} requires `{name}`')
+    if (isinstance(value, bool) or not isinstance(value, numbers.Real) or
+            not np.isfinite(value) or value <= 0):
+        raise ValueError(f'`{name}` should be a positive number, '
+                         f'not {value!r}')
+    rng = np.random.default_rng(random_state)
+    for start in range(0, rows, chunksize):
+        n = min(chunksize, rows-start)
+        trials = dist.rvs(size=n, random_state=rng)
+        if scheme == 'Fixed cutoff':
+            censor = cutoff
+        elif scheme == 'Random censoring':
+            censor = rng.exponential(censor_mean, n)
+        elif scheme == 'Staggered entry':
+            censor = study_length - rng.uniform(0, study_length, n)
+        yield (np.minimum(trials, censor),
+               (trials <= censor).astype(np.int8))
+
+
+def collect(chunks):
+    '''
+    Collect chunks of (durations, status) into a DataFrame
+    '''
+    (durations, status) = [np.concatenate(x) for x in zip(*chunks)]
+    return pd.DataFrame({'duration': durations, 'status': status})
+
+
+def write_failure_data(file, chunks):
+    '''
+    Write chunks of (durations, status) to a CSV file or buffer as they are
+    generated. Returns the number of rows written.
+    '''
+    rows = 0
+    for i, (durations, status) in enumerate(chunks):
+        df = pd.DataFrame({'duration': durations, 'status': status})
+        df.to_csv(file, mode='a' if i else 'w', header=i == 0, index=False)
+        rows += len(df)
+    return rows
@@ -0,0 +1,232 @@
+import json
+import os
+import shutil
+import struct
+import tempfile
+
+import numpy as np
+import pandas as pd
+from .data import (
+    CHUNKSIZE,
+    check_chunk,
+    check_values,
+    init_stats,
+    iter_failure_data,
+    read_failure_data,
+    update_stats
+)
+
+
+# Binary failure dataset: magic, header length, JSON header, then the
+# columns as contiguous little-endian arrays aligned to ALIGN bytes
+MAGIC = b'RELFAIL1'
+ALIGN = 64
+DTYPES = {'duration': '<f8', 'status': 'u1', 'asset_id': '<i8',
+          'timestamp': '<i8'}
+EXTENSION = '.rfd'
+
+
+def is_dataset(file):
+    '''
+    Check if a path or buffer holds a binary failure dataset by its magic
+    bytes, leaving buffers at their start
+    '''
+    if isinstance(file, (str, os.PathLike)):
+        with open(file, 'rb') as f:
+            return f.read(len(MAGIC)) == MAGIC
+    start = file.read(len(MAGIC))
+    file.seek(0)
+    return start == MAGIC or start == MAGIC.decode('latin-1')
+
+
+def aligned(n):
+    return -(-n//ALIGN)*ALIGN
+
+
+def write_dataset(file, chunks, asset_names=None):
+    '''
+    Write chunks of columns (dictionaries of `duration`, `status` and
+    optionally `asset_id` and `timestamp` arrays) as a binary dataset.
+    Columns are spooled to temporary files so any number of rows can be
+    written without holding them in memory. `asset_names` lists the names
+    of asset id codes, and is read after the chunks are consumed. Raises
+    ValueError on invalid durations or status, as for CSV files. Returns
+    the number of rows.
+    '''
+    directory = os.path.dirname(os.path.abspath(file))
+    spools = {}
+    rows = 0
+    try:
+        for chunk in chunks:
+            check_values(chunk['duration'], chunk['status'])
+            for name, values in chunk.items():
+                if name not in spools:
+                    spools[name] = tempfile.TemporaryFile(dir=directory)
+                spools[name].write(np.ascontiguousarray(
+                    values, dtype=DTYPES[name]).tobytes())
+            rows += len(chunk['duration'])
+        names = [x for x in DTYPES if x in spools]
+        if names[:2] != ['duration', 'status']:
+            raise ValueError('Fields `duration` and `status` are required')
+
+        header = {'version': 1, 'rows': rows, 'columns': [],
+                  'asset_names': list(asset_names or []) or None}
+        # Offsets depend on the header length, which depends on the offsets
+        size = 0
+        while True:
+            offset = aligned(len(MAGIC) + 4 + size)
+            header['columns'] = []
+            for name in names:
+                header['columns'].append({'name': name,
+                                          'dtype': DTYPES[name],
+                                          'offset': offset})
+                itemsize = np.dtype(DTYPES[name]).itemsize
+                offset = aligned(offset + rows*itemsize)
+            encoded = json.dumps(header).encode()
+            if len(encoded) <= size:
+                break
+            size = len(encoded) + 32
+        with open(file, 'wb') as f:
+            f.write(MAGIC + struct.pack('<I', size))
+            f.write(encoded.ljust(size))
+            for column in header['columns']:
+                f.write(b'\0'*(column['offset'] - f.tell()))
+                spool = spools[column['name']]
+                spool.seek(0)
+                shutil.copyfileobj(spool, f)
+    finally:
+        for spool in spools.values():
+            spool.close()
+    return rows
+
+
+def read_header(buffer):
+    '''
+    Parse the header of a binary dataset from its first bytes
+    '''
+    if bytes(buffer[:len(MAGIC)]) != MAGIC:
+        raise ValueError('Failed to load data. Not a binary failure dataset')
+    (size,) = struct.unpack('<I', bytes(buffer[len(MAGIC):len(MAGIC)+4]))
+    start = len(MAGIC) + 4
+    return json.loads(bytes(buffer[start:start+size]).decode())
+
+
+def open_dataset(file):
+    '''
+    Open a binary dataset without copying its columns: a path is memory
+    mapped, a buffer (such as an upload) is viewed in place. Returns a
+    dictionary of read-only arrays, timestamps as datetime64[ns], and the
+    header.
+    '''
+    if isinstance(file, (str, os.PathLike)):
+        buffer = np.memmap(file, dtype=np.uint8, mode='r')
+    else:
+        data = file.getbuffer() if hasattr(file, 'getbuffer') \
+            else file.read()
+        buffer = np.frombuffer(data, dtype=np.uint8)
+    header = read_header(buffer)
+    rows = header['rows']
+    columns = {}
+    for column in header['columns']:
+        dtype = np.dtype(column['dtype'])
+        start = column['offset']
+        columns[column['name']] = buffer[start:start+rows*dtype.itemsize] \
+            .view(dtype)
+    if 'timestamp' in columns:
+        columns['timestamp'] = columns['timestamp'].view('datetime64[ns]')
+    return columns, header
+
+
+def iter_dataset(file, chunksize=CHUNKSIZE):
+    '''
+    Yield validated (durations, status) chunks of a binary dataset as views
+    of the mapped columns, as `iter_failure_data` does for CSV files
+    '''
+    (columns, header) = open_dataset(file)
+    return column_chunks(columns, header['rows'], chunksize)
+
+
+def column_chunks(columns, rows, chunksize=CHUNKSIZE):
+    '''
+    Yield validated (durations, status) chunks of opened columns. Files
+    written elsewhere are checked as CSV files are.
+    '''
+    for start in range(0, rows, chunksize):
+        chunk = (columns['duration'][start:start+chunksize],
+                 columns['status'][start:start+chunksize])
+        check_values(*chunk)
+        yield chunk
+
+
+def convert_csv(src, dst, asset_id=None, timestamp=None,
+                chunksize=CHUNKSIZE):
+    '''
+    Convert a CSV file of failure data to a binary dataset in chunks,
+    keeping `duration` and `status` and optionally the named asset id and
+    timestamp fields. Non-numeric asset ids are stored as codes, with their
+    names in the header. Returns the number of rows.
+    '''
+    fields = {'duration': 'duration', 'status': 'status'}
+    if asset_id:
+        fields['asset_id'] = asset_id.lower()
+    if timestamp:
+        fields['timestamp'] = timestamp.lower()
+    names = {}
+
+    def chunks():
+        reader = pd.read_csv(src, chunksize=chunksize, usecols=lambda x:
+                             x.strip().lower() in fields.values())
+        for df in reader:
+            df.columns = [x.strip().lower() for x in df.columns]
+            (durations, status) = check_chunk(df)
+            chunk = {'duration': durations, 'status': status}
+            if asset_id:
+                ids = df[fields['asset_id']]
+                if not pd.api.types.is_integer_dtype(ids):
+                    ids = ids.astype(str).map(
+                        lambda x: names.setdefault(x, len(names))
+                    )
+                chunk['asset_id'] = ids.values
+            if timestamp:
+                chunk['timestamp'] = pd.to_datetime(
+                    df[fields['timestamp']]
+                ).values.astype('datetime64[ns]').view(np.int64)
+            yield chunk
+
+    # Names are complete once the chunks are consumed, before the header
+    return write_dataset(dst, chunks(), asset_names=names)
+
+
+def read_dataset(file, chunksize=CHUNKSIZE):
+    '''
+    Read a binary dataset as `read_failure_data` reads a CSV file, returning
+    a DataFrame of `duration` and `status` and its sufficient statistics
+    '''
+    (columns, header) = open_dataset(file)
+    if not header['rows']:
+        raise ValueError('Failed to load data. The file has no rows')
+    stats = init_stats()
+    for (durations, status) in column_chunks(columns, header['rows'],
+                                             chunksize):
+        stats = update_stats(stats, durations, status)
+    df = pd.DataFrame({'duration': columns['duration'],
+                       'status': columns['status'].astype(np.int8)})
+    return df, stats
+
+
+def load_failures(file, chunksize=CHUNKSIZE):
+    '''
+    Read failure data from a binary dataset or a CSV file
+    '''
+    if is_dataset(file):
+        return read_dataset(file, chunksize)
+    return read_failure_data(file, chunksize)
+
+
+def iter_failures(file, chunksize=CHUNKSIZE):
+    '''
+    Stream failure data in chunks from a binary dataset or a CSV file
+    '''
+    if is_dataset(file):
+        return iter_dataset(file, chunksize)
+    return iter_failure_data(file, chunksize)
@@ -0,0 +1,207 @@
+import hashlib
+import inspect
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from functools import wraps
+
+import numpy as np
+import pandas as pd
+from .cache import dist_key
+
+
+# Environment variables disabling the cache, and setting its file and size
+ENV = 'RELIABILITY_CACHE'
+PATH_ENV = 'RELIABILITY_CACHE_PATH'
+SIZE_ENV = 'RELIABILITY_CACHE_SIZE'
+
+STATE = {
+    'enabled': os.environ.get(ENV, '1') != '0',
+    'path': os.environ.get(PATH_ENV, os.path.join(
+        os.path.expanduser('~'), '.cache', 'reliability', 'cache.sqlite'
+    )),
+    # Size limit in bytes, given in megabytes
+    'limit': int(float(os.environ.get(SIZE_ENV, 512))*2**20)
+}
+
+
+# Connection of each thread, and the database paths set up
+_local = threading.local()
+_ready = set()
+_lock = threading.Lock()
+
+
+def set_enabled(enabled=True):
+    STATE['enabled'] = bool(enabled)
+
+
+def connect():
+    '''
+    Get the connection of this thread and process to the cache database,
+    opened on first use and reused by later calls. The database is created
+    once per path, with WAL journaling letting worker processes read while
+    another one writes.
+    '''
+    path = STATE['path']
+    key = (os.getpid(), path)
+    if getattr(_local, 'key', None) == key:
+        return _local.con
+    if getattr(_local, 'key', (None,))[0] == os.getpid():
+        # The path changed, connections inherited by a fork are left alone
+        _local.con.close()
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    con = sqlite3.connect(path, timeout=30)
+    with _lock:
+        if path not in _ready:
+            con.execute('PRAGMA journal_mode=WAL')
+            con.execute('''CREATE TABLE IF NOT EXISTS entries (
+                           key TEXT PRIMARY KEY, value BLOB, size INTEGER,
+                           accessed REAL)''')
+            _ready.add(path)
+    (_local.con, _local.key) = (con, key)
+    return con
+
+
+def normalize(x):
+    '''
+    Reduce an input to a picklable value identifying its content: frozen
+    distributions by their parameters, arrays and tables by a digest of
+    their data
+    '''
+    if isinstance(x, np.ndarray):
+        x = np.ascontiguousarray(x)
+        return ('array', x.dtype.str, x.shape,
+                hashlib.sha256(x.view(np.uint8)).hexdigest())
+    if isinstance(x, (pd.DataFrame, pd.Series)):
+        data = pd.util.hash_pandas_object(x, index=True).values
+        columns = list(x.columns) if isinstance(x, pd.DataFrame) else x.name
+        return ('frame', columns, normalize(data))
+    if hasattr(x, 'dist') and hasattr(x, 'args'):
+        return ('dist', dist_key(x))
+    if isinstance(x, dict):
+        return ('dict', tuple(sorted((k, normalize(v))
+                                     for k, v in x.items())))
+    if isinstance(x, (list, tuple)):
+        return (type(x).__name__, tuple(normalize(v) for v in x))
+    if isinstance(x, np.generic):
+        return x.item()
+    return x
+
+
+def make_key(name, version, arguments):
+    '''
+    Content address of a call as the SHA-256 of its normalized arguments
+    '''
+    payload = pickle.dumps((name, version, normalize(arguments)), protocol=4)
+    return hashlib.sha256(payload).hexdigest()
+
+
+def get(key):
+    '''
+    Get a cached value, or None, updating its access time. Entries that no
+    longer load, written by other versions of the libraries or modules,
+    are deleted.
+    '''
+    con = connect()
+    with con:
+        row = con.execute('SELECT value FROM entries WHERE key = ?',
+                          (key,)).fetchone()
+        if row is None:
+            return None
+        con.execute('UPDATE entries SET accessed = ? WHERE key = ?',
+                    (time.time(), key))
+    try:
+        return pickle.loads(row[0])
+    except Exception:
+        with con:
+            con.execute('DELETE FROM entries WHERE key = ?', (key,))
+        return None
+
+
+def put(key, value):
+    '''
+    Store a value, then evict the least recently used entries until the
+    cache fits its size limit. Values larger than the limit are not stored.
+    '''
+    blob = pickle.dumps(value, protocol=4)
+    if len(blob) > STATE['limit']:
+        return
+    con = connect()
+    with con:
+        con.execute('INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?)',
+                    (key, blob, len(blob), time.time()))
+        total = con.execute('SELECT SUM(size) FROM entries').fetchone()[0]
+        rows = con.execute('''SELECT key, size FROM entries
+                              ORDER BY accessed''')
+        evict = []
+        for (k, size) in rows.fetchall():
+            if total <= STATE['limit']:
+                break
+            evict.append((k,))
+            total -= size
+        con.executemany('DELETE FROM entries WHERE key = ?', evict)
+
+
+def clear():
+    con = connect()
+    with con:
+        con.execute('DELETE FROM entries')
+
+
+def info():
+    '''
+    Get the number of entries and total size of the cache
+    '''
+    (entries, size) = connect().execute(
+        'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries'
+    ).fetchone()
+    return {'entries': entries, 'size': size, 'limit': STATE['limit'],
+            'path': STATE['path']}
+
+
+def disk_cache(version=1, ignore=(), require=(), replay=None):
+    '''
+    Persist the results of a function in the on-disk cache, keyed by the
+    content of its arguments, so repeated calls return at once across
+    sessions and processes. Arguments in `ignore` (progress callbacks,
+    worker counts) are left out of the key, and calls where an argument in
+    `require` is None (an unset seed) are not cached. On a hit,
+    `replay(out, arguments)` is called with the cached result and all the
+    arguments, to report the progress a computed call would through its
+    callbacks. Bump `version` when the results of the function change.
+    '''
+    def decorator(func):
+        signature = inspect.signature(func)
+        name = f'{func.__module__}.{func.__qualname__}'
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not STATE['enabled']:
+                return func(*args, **kwargs)
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            arguments = {k: v for k, v in bound.arguments.items()
+                         if k not in ignore}
+            if any(arguments.get(x) is None for x in require):
+                return func(*args, **kwargs)
+            # The cache never fails a call: unhashable arguments, database
+            # errors and unstorable results only skip it
+            try:
+                key = make_key(name, version, arguments)
+                out = get(key)
+            except Exception:
+                return func(*args, **kwargs)
+            if out is not None:
+                if replay is not None:
+                    replay(out, bound.arguments)
+                return out
+            out = func(*args, **kwargs)
+            try:
+                put(key, out)
+            except Exception:
+                pass
+            return out
+        return wrapper
+    return decorator
@@ -0,0 +1,91 @@
+import numpy as np
+import pandas as pd
+
+
+# Points kept per series, well below the 5,000 rows Altair accepts
+MAX_POINTS = 1000
+
+
+def lttb(x, y, n=MAX_POINTS):
+    '''
+    Largest-Triangle-Three-Buckets downsampling of a series sorted by x.
+    Returns the indices of `n` points, keeping the first and last points
+    and, from every bucket in between, the point forming the largest
+    triangle with the previous pick and the mean of the next bucket.
+    '''
+    size = len(x)
+    if size <= n:
+        return np.arange(size)
+    if n < 3:
+        return np.array([0, size-1])
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    edges = np.linspace(1, size-1, n-1).astype(int)
+    idx = np.empty(n, dtype=int)
+    idx[0] = 0
+    idx[-1] = size-1
+    a = 0
+    for i in range(n-2):
+        (lo, hi) = (edges[i], edges[i+1])
+        nhi = edges[i+2] if i+2 < n-1 else size
+        mx = x[hi:nhi].mean()
+        my = y[hi:nhi].mean()
+        area = np.abs((x[a]-mx)*(y[lo:hi]-y[a]) -
+                      (x[a]-x[lo:hi])*(my-y[a]))
+        a = lo + int(np.argmax(area))
+        idx[i+1] = a
+    return idx
+
+
+def step_points(y):
+    '''
+    Indices of the points defining a step-after staircase: the first and
+    last points, and every point where the value changes
+    '''
+    size = len(y)
+    if size == 0:
+        return np.arange(0)
+    change = np.flatnonzero(np.diff(np.asarray(y)) != 0) + 1
+    return np.unique(np.r_[0, change, size-1])
+
+
+def downsample(df, x, ys, n=MAX_POINTS, step=False):
+    '''
+    Reduce a DataFrame sorted by `x` to at most about `n` rows per column of
+    `ys`, for charts whose payload must not grow with the data. Rows are
+    picked by LTTB on each column, together with the minimum and maximum of
+    each column. With `step`, only the change points of a staircase are
+    kept, reduced further by LTTB if there are still too many.
+    '''
+    if len(df) <= n:
+        return df
+    xs = df[x].values
+    keep = []
+    for col in ys:
+        values = df[col].values
+        if step:
+            points = step_points(values)
+            keep.append(points[lttb(xs[points], values[points], n)])
+        else:
+            keep.append(lttb(xs, values, n))
+            keep.append([np.nanargmin(values), np.nanargmax(values)])
+    return df.iloc[np.unique(np.concatenate(keep))]
+
+
+def downsample_groups(df, x, ys, by, n=MAX_POINTS):
+    '''
+    Downsample every group of a long-format DataFrame separately
+    '''
+    return pd.concat([downsample(g, x, ys, n) for (_, g) in
+                      df.groupby(by, sort=False)])
+
+
+def histogram(values, bins=20):
+    '''
+    Bin values server-side into at most `bins` bars of `start`, `end` and
+    `trials` (count), so the chart payload does not grow with the trials
+    '''
+    values = np.asarray(values, dtype=float).ravel()
+    (counts, edges) = np.histogram(values, bins=bins)
+    return pd.DataFrame({'start': edges[:-1], 'end': edges[1:],
+                         'trials': counts})
@@ -0,0 +1,82 @@
+import numpy as np
+from scipy.optimize import minimize
+from .diskcache import disk_cache
+from .profiling import timed
+
+
+def weibull_terms(theta, logt, status, weights=None, hessian=False):
+    '''
+    Censored Weibull log-likelihood `sum(status*log h(t) + log S(t))` with
+    its gradient (and Hessian) in log-parameters theta = (log shape,
+    log scale)
+    '''
+    (c, s) = np.exp(theta)
+    logs = theta[1]
+    w = 1 if weights is None else weights
+    r = np.sum(w*status)
+    a = np.sum(w*status*logt)
+    lt = logt - logs
+    with np.errstate(over='ignore'):
+        z = w*np.exp(c*lt)
+    z0 = np.sum(z)
+    z1 = np.dot(z, lt)
+    ll = r*np.log(c) - r*c*logs + (c-1)*a - z0
+    grad = np.array([r + c*(a - r*logs) - c*z1, c*(z0 - r)])
+    if not hessian:
+        return ll, grad
+    z2 = np.dot(z*lt, lt)
+    hab = c*(z0 - r) + c*c*z1
+    hess = np.array([[grad[0] - r - c*c*z2, hab],
+                     [hab, -c*c*z0]])
+    return ll, grad, hess
+
+
+def weibull_log_likelihood(params, durations, status, weights=None):
+    '''
+    Calculate the censored Weibull log-likelihood of (shape, scale)
+    '''
+    theta = np.log(params)
+    return weibull_terms(theta, np.log(durations), status, weights)[0]
+
+
+def weibull_mle(durations, status, x0=None, weights=None, maxiter=100):
+    '''
+    Fit a two-parameter Weibull to censored data by maximum likelihood, with
+    the closed-form gradient and Hessian in log-parameters. Optional weights
+    count each row, as with resampled data.
+
+    Returns the `minimize` result with `x` as (shape, scale) and `fun` as
+    the mean negative log-likelihood per row.
+    '''
+    durations = np.asarray(durations, dtype=float)
+    status = np.asarray(status, dtype=float)
+    w = np.ones(len(durations)) if weights is None \
+        else np.asarray(weights, dtype=float)
+    r = np.sum(w*status)
+    if r == 0:
+        raise ValueError('No failures observed, cannot fit distribution')
+    if x0 is None:
+        # Exponential estimate of the scale
+        x0 = [1, np.sum(w*durations)/r]
+    logt = np.log(durations)
+    # The mean log-likelihood keeps the gradient tolerance meaningful
+    # whatever the number of rows
+    w = w/np.sum(w)
+
+    opt = minimize(lambda x: [-y for y in weibull_terms(x, logt, status,
+                                                        w)],
+                   x0=np.log(x0), jac=True,
+                   hess=lambda x: -weibull_terms(x, logt, status, w,
+                                                 hessian=True)[2],
+                   method='trust-exact', options={'maxiter': maxiter})
+    opt['x'] = np.exp(opt['x'])
+    return opt
+
+
+@timed()
+@disk_cache(version=2)
+def fit_weibull(durations, status, x0=None, weights=None, maxiter=100):
+    '''
+    Cached `weibull_mle`
+    '''
+    return weibull_mle(durations, status, x0, weights, maxiter)
@@ -0,0 +1,107 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from scipy.special import gamma, gammainc
+from .diskcache import disk_cache
+from .profiling import timed
+
+
+# Fields of an asset class table
+COLUMNS = ['shape', 'scale', 'oh', 'sfcost', 'mcost']
+# Rows optimized at once, bounding the memory of the cost grid
+CHUNK = 8192
+# Maintenance intervals searched, relative to the scale
+GRID = np.geomspace(1e-3, 1e2, 128)
+# Relative saving over running to failure for maintenance to pay
+TOLERANCE = 1e-6
+
+
+def normalized_cost(x, c, sfcost, mcost):
+    '''
+    Yearly cost per operating hour times the scale of Weibull assets
+    maintained at `x` times their scale, broadcasting across rows
+    '''
+    cdf = -np.expm1(-x**c)
+    cycle = gamma(1/c)/c*gammainc(1/c, x**c)
+    return (sfcost*cdf + mcost*(1-cdf))/cycle
+
+
+def optimize_chunk(table, iterations=30):
+    '''
+    Optimize the maintenance interval of each row of an asset class table by
+    a grid search, refined with golden-section search between neighbouring
+    grid points of all rows at once. Rows where the optimum does not beat
+    running to failure, as with shapes of at most 1, run to failure.
+    '''
+    [c, scale, oh, sfcost, mcost] = [table[x].values.astype(float)[:, None]
+                                     for x in COLUMNS]
+    costs = normalized_cost(GRID, c, sfcost, mcost)
+    i = np.nanargmin(costs, axis=1)
+    lo = GRID[np.maximum(i-1, 0)][:, None]
+    hi = GRID[np.minimum(i+1, len(GRID)-1)][:, None]
+    ratio = (np.sqrt(5)-1)/2
+    for _ in range(iterations):
+        x1 = hi - ratio*(hi-lo)
+        x2 = lo + ratio*(hi-lo)
+        left = (normalized_cost(x1, c, sfcost, mcost) <
+                normalized_cost(x2, c, sfcost, mcost))
+        hi = np.where(left, x2, hi)
+        lo = np.where(left, lo, x1)
+    x = (lo+hi)/2
+    # Cost keeps decreasing with longer intervals, or reaches a plateau,
+    # without a hazard rate increasing with age
+    failure = sfcost/gamma(1+1/c)
+    success = ((c > 1) & (i[:, None] < len(GRID) - 1) &
+               (normalized_cost(x, c, sfcost, mcost) <
+                failure*(1-TOLERANCE)))[:, 0]
+
+    cdf = -np.expm1(-x**c)
+    cycle = scale*gamma(1/c)/c*gammainc(1/c, x**c)
+    mean = scale*gamma(1+1/c)
+    # Run to failure where maintenance does not pay
+    mtbf = np.where(success[:, None], cycle/cdf, mean)
+    mcount = np.where(success[:, None], oh*(1-cdf)/cycle, 0)
+    failures = oh/mtbf
+    out = pd.DataFrame({
+        'interval': np.where(success, (x*scale)[:, 0], np.inf),
+        'failures': failures[:, 0],
+        'mcount': mcount[:, 0],
+        'fcost': (failures*sfcost)[:, 0],
+        'mcost': (mcount*mcost)[:, 0],
+        'mtbf': mtbf[:, 0],
+        'success': success
+    }, index=table.index)
+    out['cost'] = out['fcost'] + out['mcost']
+    return out
+
+
+@timed()
+@disk_cache(version=2, ignore=('workers', 'chunk'))
+def optimize_fleet(table, workers=1, chunk=CHUNK):
+    '''
+    Optimize the maintenance interval of many Weibull asset classes, given
+    as a table with fields `shape`, `scale`, `oh` (yearly operational
+    hours), `sfcost` and `mcost`. Chunks of rows are optionally spread
+    across processes.
+
+    Returns the table with the expected yearly figures of the cost-optimized
+    interval as `calculate` gives them, the yearly maintenance cost being
+    `mcost_yearly`.
+    '''
+    missing = [x for x in COLUMNS if x not in table.columns]
+    if missing:
+        raise ValueError(f'Missing fields: {", ".join(missing)}')
+    chunks = [table.iloc[i:i+chunk] for i in range(0, len(table), chunk)]
+    chunks = chunks or [table]
+    workers = min(workers or os.cpu_count() or 1, len(chunks))
+    if workers <= 1:
+        results = [optimize_chunk(x) for x in chunks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(optimize_chunk, chunks))
+    out = pd.concat(results)
+    return table.join(out[['interval', 'failures', 'mcount', 'fcost',
+                           'mcost', 'cost', 'mtbf', 'success']],
+                      rsuffix='_yearly')
@@ -1,7 +1,13 @@
 import base64
+import gzip
+import io
 from pathlib import Path
 
 
+# Rows written per chunk when exporting tables
+CHUNKSIZE = 100000
+
+
 def read_markdown_file(markdown_file):
     return Path(markdown_file).read_text()
 
@@ -10,3 +16,39 @@ def img_to_bytes(img_path):
     img_bytes = Path(img_path).read_bytes()
     encoded = base64.b64encode(img_bytes).decode()
     return encoded
+
+
+def has_parquet():
+    '''
+    Check if a Parquet engine is installed
+    '''
+    for engine in ['pyarrow', 'fastparquet']:
+        try:
+            __import__(engine)
+            return True
+        except ImportError:
+            pass
+    return False
+
+
+def to_csv_gz(df, chunksize=CHUNKSIZE):
+    '''
+    Write a DataFrame as gzip-compressed CSV bytes, encoding it in chunks so
+    the uncompressed text is never held in memory at once
+    '''
+    buffer = io.BytesIO()
+    with gzip.GzipFile(fileobj=buffer, mode='wb') as f:
+        f.write(df.head(0).to_csv(index=False).encode())
+        for i in range(0, len(df), chunksize):
+            f.write(df.iloc[i:i+chunksize].to_csv(index=False,
+                                                  header=False).encode())
+    return buffer.getvalue()
+
+
+def to_parquet(df):
+    '''
+    Write a DataFrame as Parquet bytes
+    '''
+    buffer = io.BytesIO()
+    df.to_parquet(buffer, index=False)
+    return buffer.getvalue()
@@ -0,0 +1,187 @@
+import os
+import threading
+import time
+import uuid
+
+from . import profiling
+
+# Environment variable setting how many jobs run at once, the others
+# waiting their turn so heavy jobs do not starve every session
+ENV = 'RELIABILITY_JOBS'
+MAX_RUNNING = max(int(os.environ.get(ENV, 2)), 1)
+# Finished jobs kept in the registry with their results, oldest forgotten
+# first
+HISTORY = 10
+# Job states, the first two active
+STATES = ['queued', 'running', 'cancelled', 'failed', 'done']
+
+# Registry of jobs by key, shared by every session of the server process
+JOBS = {}
+_lock = threading.Lock()
+_slots = threading.Semaphore(MAX_RUNNING)
+
+
+class Job:
+    '''
+    Computation run in a background thread, outside the rerun cycle of the
+    app. `steps(job)` is a generator doing units of work (rounds of
+    simulated trials) and yielding between them, recording its progress in
+    `done` out of `total`, partial results in the `data` dictionary and the
+    final result in `result`.
+
+    Cancelling stops the job after the current step. Resuming restarts the
+    generator, which continues from the progress and data recorded so far.
+    Timings are recorded in the profiling collector of the run that
+    submitted the job, if any.
+    '''
+    def __init__(self, key, steps, total, label=''):
+        self.key = key
+        self.steps = steps
+        self.total = total
+        self.label = label
+        self.state = 'queued'
+        self.done = 0
+        self.data = {}
+        self.result = None
+        self.error = None
+        self.created = time.time()
+        # Seconds run before the current run, and its start
+        self._elapsed = 0.0
+        self._since = None
+        self._stop = threading.Event()
+        self._thread = None
+        # Threads do not inherit the context of the submitting run
+        self.collector = profiling.current()
+
+    @property
+    def active(self):
+        return self.state in STATES[:2]
+
+    @property
+    def elapsed(self):
+        since = self._since
+        running = 0.0 if since is None else time.perf_counter() - since
+        return self._elapsed + running
+
+    @property
+    def progress(self):
+        return min(self.done/self.total, 1.0) if self.total else 0.0
+
+    def start(self):
+        self._stop.clear()
+        self.state = 'queued'
+        self.error = None
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        with _slots, profiling.collecting(self.collector):
+            if self._stop.is_set():
+                self.state = 'cancelled'
+                return
+            self.state = 'running'
+            self._since = time.perf_counter()
+            steps = self.steps(self)
+            state = 'done'
+            try:
+                for _ in steps:
+                    if self._stop.is_set():
+                        state = 'cancelled'
+                        break
+            except Exception as e:
+                self.error = f'{type(e).__name__}: {e}'
+                state = 'failed'
+            finally:
+                steps.close()
+                self._elapsed += time.perf_counter() - self._since
+                self._since = None
+                # Only settled once the steps are closed, so a resumed job
+                # never overlaps its previous run
+                self.state = state
+
+    def cancel(self):
+        '''
+        Stop the job after its current step
+        '''
+        self._stop.set()
+
+    def resume(self):
+        '''
+        Continue a cancelled or failed job from its recorded progress. The
+        state is claimed under the lock, so sessions sharing the job and
+        resuming it at once start a single run.
+        '''
+        with _lock:
+            if self.state not in ['cancelled', 'failed']:
+                return
+            self.state = 'queued'
+        self.start()
+
+    def wait(self, timeout=None):
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+
+def prune():
+    '''
+    Forget the oldest finished jobs beyond `HISTORY`
+    '''
+    finished = sorted((x for x in JOBS.values() if not x.active),
+                      key=lambda x: x.created)
+    for job in finished[:max(len(finished) - HISTORY, 0)]:
+        del JOBS[job.key]
+
+
+def submit(key, steps, total, label=''):
+    '''
+    Start a job under `key`, or get the job already registered under it,
+    so sessions asking for the same computation share one job. A key of
+    None always starts a new job.
+    '''
+    with _lock:
+        key = key or uuid.uuid4().hex
+        if key in JOBS:
+            return JOBS[key]
+        prune()
+        job = Job(key, steps, total, label)
+        JOBS[key] = job
+    job.start()
+    return job
+
+
+def get(key):
+    return JOBS.get(key)
+
+
+def forget(key):
+    '''
+    Cancel a job and remove it from the registry
+    '''
+    with _lock:
+        job = JOBS.pop(key, None)
+    if job is not None:
+        job.cancel()
+
+
+def call_steps(func, *args, **kwargs):
+    '''
+    Steps of a job calling a function once, for computations that cannot
+    be split. Cancelling only applies before the call starts.
+    '''
+    def steps(job):
+        # A chance to cancel before the call
+        yield
+        job.result = func(*args, **kwargs)
+        job.done = job.total
+    return steps
+
+
+def report():
+    '''
+    Get the registered jobs as records, newest first
+    '''
+    with _lock:
+        jobs = sorted(JOBS.values(), key=lambda x: -x.created)
+    return [{'job': x.label or x.key[:8], 'state': x.state,
+             'progress': x.progress, 'elapsed': x.elapsed,
+             'error': x.error} for x in jobs]
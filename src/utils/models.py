@@ -0,0 +1,226 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from scipy.optimize import minimize
+from scipy.special import gammaln, logit
+from scipy.stats import (
+    exponweib,
+    fisk,
+    gamma,
+    lognorm,
+    norm,
+    weibull_min
+)
+from .diskcache import disk_cache
+from .fit import fit_weibull
+from .profiling import timed
+
+
+# Candidate families of failure distributions, with their SciPy
+# distribution and parameters. Location parameters are kept below the
+# shortest failure duration, the others positive.
+MODELS = {
+    'Weibull': {'dist': weibull_min, 'params': ['c', 'scale']},
+    'Weibull (3-parameter)': {'dist': weibull_min,
+                              'params': ['c', 'loc', 'scale']},
+    'Exponentiated Weibull': {'dist': exponweib,
+                              'params': ['a', 'c', 'scale']},
+    'Lognormal': {'dist': lognorm, 'params': ['s', 'scale']},
+    'Gamma': {'dist': gamma, 'params': ['a', 'scale']},
+    'Log-logistic': {'dist': fisk, 'params': ['c', 'scale']}
+}
+# Optimizers tried in turn for families without closed-form derivatives
+METHODS = ['BFGS', 'Nelder-Mead']
+
+
+def median_ranks(durations, status):
+    '''
+    Median ranks of the failures by Johnson's adjusted ranks for censored
+    data and Bernard's approximation. Returns the failure durations and
+    their estimated cumulative probabilities.
+    '''
+    order = np.argsort(durations, kind='stable')
+    t = durations[order]
+    failed = status[order] > 0
+    n = len(t)
+    # Each failure moves the adjusted rank towards n+1 by the fraction
+    # 1/(items left + 1), hence the product of the remaining gaps
+    left = n - np.flatnonzero(failed)
+    rank = (n+1)*(1 - np.cumprod(left/(left+1)))
+    return t[failed], (rank-0.3)/(n+0.4)
+
+
+def rank_regression(durations, status, transform):
+    '''
+    Regress the transformed median ranks of the failures on their log
+    durations, returning the slope and intercept, or None with fewer than
+    two distinct failure durations
+    '''
+    (t, f) = median_ranks(durations, status)
+    if len(np.unique(t)) < 2:
+        return None
+    (slope, intercept) = np.polyfit(np.log(t), transform(f), 1)
+    if not np.isfinite(slope) or slope <= 0:
+        return None
+    return slope, intercept
+
+
+def start_values(name, durations, status):
+    '''
+    Starting values of a family from median rank regression, with the
+    gamma matched to the moments of the regressed Weibull. Without enough
+    failures, an exponential with the mean time between failures.
+    '''
+    mtbf = durations.sum()/max(status.sum(), 1)
+    if name == 'Lognormal':
+        fit = rank_regression(durations, status, norm.ppf)
+        if fit is None:
+            return [1, mtbf]
+        # norm.ppf(F) = (log t - mu)/s
+        return [1/fit[0], np.exp(-fit[1]/fit[0])]
+    if name == 'Log-logistic':
+        fit = rank_regression(durations, status, logit)
+        if fit is None:
+            return [1, mtbf]
+        return [fit[0], np.exp(-fit[1]/fit[0])]
+
+    fit = rank_regression(durations, status, lambda f: np.log(-np.log1p(-f)))
+    (c, scale) = (1, mtbf) if fit is None \
+        else (fit[0], np.exp(-fit[1]/fit[0]))
+    if name == 'Weibull':
+        return [c, scale]
+    if name == 'Weibull (3-parameter)':
+        return [c, 0, scale]
+    if name == 'Exponentiated Weibull':
+        return [1, c, scale]
+    # Gamma with the mean and variance of the Weibull
+    m1 = np.exp(gammaln(1+1/c))
+    var = np.exp(gammaln(1+2/c)) - m1**2
+    return [m1**2/var, scale*var/m1]
+
+
+def to_theta(name, params, tmin):
+    '''
+    Map parameters to the unconstrained space searched by the optimizer
+    '''
+    theta = []
+    for key, x in zip(MODELS[name]['params'], params):
+        theta.append(np.log(tmin - x) if key == 'loc' else np.log(x))
+    return np.array(theta)
+
+
+def from_theta(name, theta, tmin):
+    return [tmin - np.exp(x) if key == 'loc' else np.exp(x)
+            for key, x in zip(MODELS[name]['params'], theta)]
+
+
+def freeze(name, params):
+    '''
+    Freeze the distribution of a family from its parameters
+    '''
+    return MODELS[name]['dist'](**dict(zip(MODELS[name]['params'], params)))
+
+
+def censored_log_likelihood(dist, durations, status, weights=None):
+    '''
+    Censored log-likelihood `sum(status*log f(t) + (1-status)*log S(t))` of
+    a frozen distribution, vectorized over the rows
+    '''
+    failed = status > 0
+    w = np.ones(len(durations)) if weights is None else weights
+    with np.errstate(all='ignore'):
+        return (np.dot(w[failed], dist.logpdf(durations[failed])) +
+                np.dot(w[~failed], dist.logsf(durations[~failed])))
+
+
+@timed()
+def fit_model(name, durations, status, weights=None, maxiter=500):
+    '''
+    Fit one family to censored data by maximum likelihood from its
+    `start_values`, trying `fit_weibull` first for the Weibull and then the
+    optimizers in `METHODS` in turn. Returns a dictionary of the family,
+    its parameters, log-likelihood, information criteria, optimizer,
+    iterations and whether it converged.
+    '''
+    durations = np.asarray(durations, dtype=float)
+    status = np.asarray(status, dtype=float)
+    n = len(durations) if weights is None else np.sum(weights)
+    k = len(MODELS[name]['params'])
+    # Failures bound the location, censored items may precede it
+    tmin = durations[status > 0].min()
+    x0 = to_theta(name, start_values(name, durations, status), tmin)
+
+    def objective(theta):
+        # Mean over the rows keeps gradients of large data well scaled
+        dist = freeze(name, from_theta(name, theta, tmin))
+        ll = censored_log_likelihood(dist, durations, status, weights)
+        return -ll/n if np.isfinite(ll) else np.inf
+
+    # Closed-form gradient and Hessian for the Weibull
+    methods = (['trust-exact'] if name == 'Weibull' else []) + METHODS
+    for method in methods:
+        if method == 'trust-exact':
+            opt = dict(fit_weibull(durations, status, x0=np.exp(x0),
+                                   weights=weights))
+            opt['x'] = np.log(opt['x'])
+        else:
+            opt = minimize(objective, x0=x0, method=method,
+                           options={'maxiter': maxiter})
+        if opt['success']:
+            break
+    params = from_theta(name, opt['x'], tmin)
+
+    ll = censored_log_likelihood(freeze(name, params), durations, status,
+                                 weights)
+    success = bool(opt['success']) and np.isfinite(ll)
+    if name == 'Weibull (3-parameter)' and params[0] < 1:
+        # The likelihood grows without bound as the location approaches
+        # the first failure, the optimizer only stopped somewhere
+        success = False
+    return {'model': name, 'params': params, 'k': k, 'loglik': ll,
+            'aic': 2*k - 2*ll, 'bic': k*np.log(n) - 2*ll,
+            'method': method, 'nit': opt['nit'], 'success': success}
+
+
+def _fit_model(args):
+    return fit_model(*args)
+
+
+@timed()
+@disk_cache(version=2, ignore=('workers',))
+def fit_models(durations, status, models=None, weights=None, workers=1):
+    '''
+    Fit several families (all of `MODELS` by default) to censored data,
+    optionally one per process, and rank them by AIC, failed fits last.
+    Akaike weights give the relative likelihood of each family being the
+    best of the set, and are NaN for failed fits.
+
+    Returns a DataFrame of the fits indexed by family, best first.
+    '''
+    models = list(models or MODELS)
+    unknown = [x for x in models if x not in MODELS]
+    if unknown:
+        raise ValueError(f'Unknown distributions: {", ".join(unknown)}')
+    durations = np.asarray(durations, dtype=float)
+    status = np.asarray(status, dtype=float)
+    if np.sum(status) == 0:
+        raise ValueError('No failures observed, cannot fit distribution')
+    tasks = [(x, durations, status, weights) for x in models]
+    workers = min(workers or os.cpu_count() or 1, len(tasks))
+    if workers <= 1:
+        results = [_fit_model(x) for x in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(_fit_model, tasks))
+
+    df = pd.DataFrame(results).set_index('model')
+    df = df.sort_values(['success', 'aic'], ascending=[False, True])
+    # Failed fits are left out of the weights, their AIC is meaningless
+    aic = df['aic'].where(df['success'])
+    df['delta_aic'] = aic - aic.min()
+    weight = np.exp(-df['delta_aic']/2)
+    df['akaike_weight'] = weight/weight.sum()
+    return df[['params', 'k', 'loglik', 'aic', 'bic', 'delta_aic',
+               'akaike_weight', 'method', 'nit', 'success']]
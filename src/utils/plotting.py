@@ -2,12 +2,36 @@ import altair as alt
 import numpy as np
 import pandas as pd
 import streamlit as st
-from .utils import (
-    floor_magnitude,
-    get_test_properties
+from .downsample import (
+    downsample,
+    downsample_groups,
+    histogram
 )
+from .profiling import timed
+from .sprt import oc_curves
+from .utils import floor_magnitude
 
 
+@timed()
+def plot_cost_curve(curve, cutoff, opt):
+    # Yearly cost against maintenance interval, with the chosen and the
+    # cost-optimized intervals marked
+    curve = downsample(curve, 'interval', ['cost'])
+    line = alt.Chart(curve, height=300, width=650).mark_line().encode(
+        x=alt.X('interval', title='Maintenance Interval',
+                scale=alt.Scale(type='log')),
+        y=alt.Y('cost', title='Yearly Cost', scale=alt.Scale(zero=False))
+    )
+    marks = pd.DataFrame({'interval': [cutoff, opt],
+                          'Interval': ['Chosen', 'Cost-Optimized']})
+    rules = alt.Chart(marks).mark_rule(strokeDash=[4, 4]).encode(
+        x='interval', color=alt.Color('Interval:N',
+                                      scale=alt.Scale(scheme='tableau20'))
+    )
+    st.altair_chart(line + rules)
+
+
+@timed()
 def plot_distribution(dist):
     # Get CDF and PDF
     # For time from 0 to the 99% percentile with steps of its magnitude - 2
@@ -18,6 +42,7 @@ def plot_distribution(dist):
                                        int(mag/100))]})
     df['CDF'] = dist.cdf(df['Hours'])
     df['PDF'] = dist.pdf(df['Hours'])
+    df = downsample(df, 'Hours', ['CDF', 'PDF'])
 
     base = alt.Chart(
         df, height=300, width=650).mark_area(line=True).transform_fold(
@@ -36,19 +61,29 @@ def plot_distribution(dist):
     st.altair_chart(fig)
 
 
-def plot_properties(state, tid, noc, oh):
-    # Get parameters for the test ID
-    params_ = [x[1:] for x in state if x[0] == tid][0]
-    et = get_test_properties(noc=noc, *params_)
+@timed()
+def plot_properties(state, tid, noc, oh, compare=()):
+    # Get parameters for the test ID and the plans to compare with
+    tids = [tid] + [x for x in compare if x != tid]
+    plans = [[x for x in state if x[0] == t][0] for t in tids]
+    params_ = plans[0][1:]
+    (_, m, pa, et) = oc_curves(*zip(*[x[1:] for x in plans]), noc=noc)
+    et = pd.DataFrame({'ID': np.repeat(tids, m.shape[1]), 'm': m.ravel(),
+                       'Pa': pa.ravel(), 'Et': et.ravel()})
+    et = downsample_groups(et, 'm', ['Pa', 'Et'], 'ID')
     # Plot the properties
-    oc = alt.Chart(et, height=250, width=300).mark_area(line=True).encode(
+    opacity = 0.3 if len(tids) > 1 else 0.7
+    oc = alt.Chart(et, height=250, width=300).mark_area(
+        line=True, opacity=opacity).encode(
         x=alt.X('m', title='Actual MTBF'),
-        y=alt.Y('Pa', title='Probability of Acceptance')
+        y=alt.Y('Pa', title='Probability of Acceptance'),
+        color=alt.Color('ID:N', scale=alt.Scale(scheme='tableau20'))
         ).properties(title='Operating Characteristic Curve')
-    exp_time = alt.Chart(et, height=250,
-                         width=300).mark_area(line=True).encode(
+    exp_time = alt.Chart(et, height=250, width=300).mark_area(
+        line=True, opacity=opacity).encode(
         x=alt.X('m', title='Actual MTBF'),
-        y=alt.Y('Et', title='Expected Time to Decision')
+        y=alt.Y('Et', title='Expected Time to Decision'),
+        color=alt.Color('ID:N', scale=alt.Scale(scheme='tableau20'))
         ).properties(title='Actual MTBF vs Et')
     st.altair_chart(oc | exp_time)
     a_ = np.log(params_[1]/(1-params_[0]))/np.log(params_[2])
@@ -58,16 +93,18 @@ def plot_properties(state, tid, noc, oh):
              noc, 'components.')
 
 
+@timed()
 def plot_seq_chart(cumul, idx, bounds, d, m0):
     (lb, ub) = bounds
-    cml = cumul.loc[:idx+1, ['duration', 'status']]
+    cml = cumul.loc[:idx, ['duration', 'status']]
     # Maximum duration
     maxd = cml.tail(1)['duration'].values[0]
     # Maximum number of failure
     maxf = cml.tail(1)['status'].values[0]
-    cml = cml.append(pd.DataFrame({'duration': 0, 'status': 0},
-                     index=[0]))
+    cml = pd.concat([pd.DataFrame({'duration': [0], 'status': [0]}), cml])
     cml = cml.sort_values('duration').reset_index(drop=True)
+    # Keep the steps of the staircase, the boundaries being straight lines
+    cml = downsample(cml, 'duration', ['status'], step=True)
     a = np.log(lb)/np.log(d)
     c = np.log(ub)/np.log(d)
     b = (d-1)/(m0*np.log(d))
@@ -111,58 +148,110 @@ def plot_seq_chart(cumul, idx, bounds, d, m0):
     st.altair_chart(fstatus + faccept + freject)
 
 
-def plot_uncertainty_chart(df):
+@timed()
+def plot_uncertainty_chart(df, expected=None):
+    bins = histogram(df['count'])
     fig = alt.Chart(
-        df, height=150, width=180
+        bins, height=150, width=180
     ).mark_bar(opacity=0.7).encode(
-        alt.X('count', bin=alt.Bin(maxbins=20)), y='count()'
+        alt.X('start', bin='binned', title='count'), x2='end',
+        y=alt.Y('trials', title='Trials')
     )
+    if expected is not None:
+        # Mark the analytical expectation
+        rule = alt.Chart(pd.DataFrame({'start': [expected]})).mark_rule(
+            color='red', strokeDash=[4, 4]).encode(x='start')
+        fig = fig + rule
     return fig
 
 
-def plot_sequential_test(df, params):
+@timed()
+def plot_expected_counts(curve):
+    # Expected counts and cost of a trial over time from the renewal
+    # equation
+    curve = downsample(curve, 'time', ['failures', 'maintenances', 'cost'])
+    base = alt.Chart(curve, height=200, width=300).encode(
+        x=alt.X('time', title='Hours per Component')
+    )
+    counts = base.transform_fold(
+        ['failures', 'maintenances'], as_=['Measure', 'Value']
+    ).mark_line().encode(
+        y=alt.Y('Value:Q', title='Expected Count'),
+        color=alt.Color('Measure:N', scale=alt.Scale(scheme='tableau20'))
+    ).properties(title='Expected Counts')
+    cost = base.mark_line().encode(
+        y=alt.Y('cost', title='Expected Cost')
+    ).properties(title='Expected Cost')
+    return counts | cost
+
+
+@timed()
+def plot_convergence(history, metric):
+    # Running estimate of an early-stopping simulation with its confidence
+    # band against the number of trials
+    history = downsample(history, 'rept', ['value', 'low', 'high'])
+    base = alt.Chart(history, height=200, width=650).encode(
+        x=alt.X('rept', title='Trials')
+    )
+    band = base.mark_area(opacity=0.3).encode(
+        y=alt.Y('low', title=metric, scale=alt.Scale(zero=False)), y2='high'
+    )
+    line = base.mark_line(point=True).encode(y='value')
+    return band + line
+
+
+@timed()
+def plot_bootstrap(replicates, intervals):
+    # Bootstrap distribution of each estimate, binned server-side, with the
+    # point estimate (solid) and confidence limits (dashed)
+    charts = []
+    for name, row in intervals.iterrows():
+        values = replicates.loc[replicates['success'], name]
+        bins = histogram(values[np.isfinite(values)])
+        fig = alt.Chart(bins, height=150, width=150).mark_bar(
+            opacity=0.7
+        ).encode(
+            alt.X('start', bin='binned', title=name), x2='end',
+            y=alt.Y('trials', title='Replicates')
+        )
+        limits = pd.DataFrame({'start': [row['low'], row['high']]})
+        estimate = pd.DataFrame({'start': [row['estimate']]})
+        fig = fig + alt.Chart(limits).mark_rule(
+            color='red', strokeDash=[4, 4]).encode(x='start')
+        fig = fig + alt.Chart(estimate).mark_rule(color='red').encode(
+            x='start')
+        charts.append(fig)
+    return alt.hconcat(*charts)
+
+
+@timed()
+def plot_sequential_test(test, params):
     '''
-    Implement test plan on given data
+    Show the outcome of a sequential test run on given data
     '''
     (lb, ub, d, m0, oh, noc) = params
-    df.columns = [x.lower() for x in df.columns]
-    # Get cumulative failures/maintenances time
-    cumul = df.cumsum()
-    pr_exponent = cumul['duration']*(1-d)/m0
-    cumul['p_ratio'] = np.power(d, cumul['status'])*np.exp(pr_exponent)
-    cumul['accept'] = cumul['p_ratio'] < lb
-    cumul['reject'] = cumul['p_ratio'] > ub
-    ac = cumul['accept']
-    rj = cumul['reject']
-    ac = ac[ac == 1]
-    rj = rj[rj == 1]
     # Look for index where it is accepted/rejected
-    success = False
-    if len(ac) == 0 and len(rj) == 0:
+    if test.decision is None:
         st.warning('Test time not enough')
-    elif len(rj) == 0:
-        success = True
-        idx = ac.idxmax()
+        return
+    elif test.decision == 'accept':
         st.info('Specification accepted')
-    elif len(ac) == 0:
-        success = True
-        idx = rj.idxmax()
+    elif test.decision == 'reject':
         st.error('Specification rejected')
-    else:
-        success = True
-        idx = min(ac.idxmax(), rj.idxmax())
-
-    if success:
-        row = cumul.iloc[idx, :][['duration', 'status']]
-        st.write('Test cumulative duration:', int(row['duration']),
-                 'hours (', round(row['duration']/oh/noc, 2),
-                 'years over', noc, 'components)')
-        st.write('Test cumulative failures:', row['status'])
-
-        showr = st.checkbox('Show sequential test results?')
-        if showr:
-            st.write(cumul.iloc[:idx+1, :])
-
-        showc = st.checkbox('Show sequential test chart?')
-        if showc:
-            plot_seq_chart(cumul, idx, (lb, ub), d, m0)
+
+    idx = test.index
+    cumul = test.cumulative()
+    # Rows are labelled by their position, the decision row always kept
+    row = cumul.loc[idx, ['duration', 'status']]
+    st.write('Test cumulative duration:', int(row['duration']),
+             'hours (', round(row['duration']/oh/noc, 2),
+             'years over', noc, 'components)')
+    st.write('Test cumulative failures:', row['status'])
+
+    showr = st.checkbox('Show sequential test results?')
+    if showr:
+        st.write(cumul.loc[:idx, :])
+
+    showc = st.checkbox('Show sequential test chart?')
+    if showc:
+        plot_seq_chart(cumul, idx, (lb, ub), d, m0)
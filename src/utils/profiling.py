@@ -0,0 +1,182 @@
+import cProfile
+import contextvars
+import io
+import json
+import os
+import pstats
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+
+# Environment variables enabling instrumentation and its JSON lines log
+ENV = 'RELIABILITY_PROFILE'
+LOG_ENV = 'RELIABILITY_PROFILE_LOG'
+
+
+class Collector:
+    '''
+    Calls, total and maximum time by instrumented name, recorded by one run
+    of the app (or the whole process) and the background jobs it starts
+    '''
+    def __init__(self):
+        self.stats = {}
+        self._lock = threading.Lock()
+
+    def record(self, name, elapsed):
+        with self._lock:
+            stats = self.stats.setdefault(name, {'calls': 0, 'total': 0.0,
+                                                 'max': 0.0})
+            stats['calls'] += 1
+            stats['total'] += elapsed
+            stats['max'] = max(stats['max'], elapsed)
+
+    def reset(self):
+        with self._lock:
+            self.stats.clear()
+
+    def report(self):
+        with self._lock:
+            records = [dict(name=k, mean=v['total']/v['calls'], **v)
+                       for k, v in self.stats.items()]
+        return sorted(records, key=lambda x: -x['total'])
+
+
+# Collector of the current context, None when instrumentation is disabled.
+# Sessions and threads each have their own context, the environment
+# variable enabling a collector shared by the contexts that set none.
+_collector = contextvars.ContextVar(
+    'collector',
+    default=Collector() if os.environ.get(ENV, '') not in ('', '0') else None
+)
+
+
+def is_enabled():
+    return _collector.get() is not None
+
+
+def current():
+    '''
+    Get the collector of the current context, to pass on to other threads
+    '''
+    return _collector.get()
+
+
+def set_enabled(enabled=True):
+    '''
+    Enable instrumentation in the current context with a new collector, or
+    disable it
+    '''
+    _collector.set(Collector() if enabled else None)
+
+
+@contextmanager
+def collecting(collector):
+    '''
+    Record the timings of a block in `collector`, or none if None, leaving
+    other runs and threads unaffected
+    '''
+    token = _collector.set(collector)
+    try:
+        yield collector
+    finally:
+        _collector.reset(token)
+
+
+def reset():
+    '''
+    Clear the recorded timings of the current context
+    '''
+    collector = _collector.get()
+    if collector is not None:
+        collector.reset()
+
+
+def record(name, elapsed):
+    '''
+    Record one call of `name` taking `elapsed` seconds
+    '''
+    collector = _collector.get()
+    if collector is not None:
+        collector.record(name, elapsed)
+
+
+@contextmanager
+def timer(name):
+    '''
+    Time a block of code under `name` when instrumentation is enabled
+    '''
+    collector = _collector.get()
+    if collector is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        collector.record(name, time.perf_counter() - start)
+
+
+def timed(name=None):
+    '''
+    Time and count the calls of a function when instrumentation is
+    enabled, under `name` or the qualified name of the function. Disabled,
+    it costs a context variable lookup per call.
+    '''
+    def decorator(func):
+        label = name or f'{func.__module__}.{func.__qualname__}'
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            collector = _collector.get()
+            if collector is None:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                collector.record(label, time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+def report(collector=None):
+    '''
+    Get the timings recorded by `collector`, or the collector of the
+    current context, as records sorted by total time
+    '''
+    collector = collector or _collector.get()
+    return [] if collector is None else collector.report()
+
+
+def profile(func, *args, limit=30, **kwargs):
+    '''
+    Run a function under cProfile. Returns its result and the statistics of
+    the `limit` functions with the most cumulative time as text.
+    '''
+    profiler = cProfile.Profile()
+    try:
+        out = profiler.runcall(func, *args, **kwargs)
+    finally:
+        buffer = io.StringIO()
+        stats = pstats.Stats(profiler, stream=buffer)
+        stats.sort_stats('cumulative').print_stats(limit)
+    return out, buffer.getvalue()
+
+
+def write_log(path=None, collector=None, **context):
+    '''
+    Append the timings recorded by `collector`, or the collector of the
+    current context, as JSON lines, one per instrumented name, to `path` or
+    the file named by the RELIABILITY_PROFILE_LOG variable, with a
+    timestamp and the context given as keywords
+    '''
+    path = path or os.environ.get(LOG_ENV)
+    if not path:
+        return
+    timestamp = time.time()
+    with open(path, 'a') as f:
+        for x in report(collector):
+            f.write(json.dumps(dict(timestamp=timestamp, **context, **x)))
+            f.write('\n')
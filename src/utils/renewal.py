@@ -0,0 +1,118 @@
+import numpy as np
+import pandas as pd
+from .cache import memoize_dist
+from .profiling import timed
+
+
+# Grid points of the renewal equation, at least, and at most
+POINTS = 4096
+MAX_POINTS = 2**20
+# Damping of the FFT against wrap-around, relative to the padded length
+DAMPING = 1e-8
+
+
+def grid_points(dist, cutoff, horizon):
+    '''
+    Number of grid points resolving the renewals up to the horizon with
+    at least 32 points per mean time between renewals
+    '''
+    mean = min(dist.mean(), cutoff)
+    if not np.isfinite(mean) or mean <= 0:
+        return POINTS
+    return int(np.clip(32*horizon/mean, POINTS, MAX_POINTS))
+
+
+def renewal_masses(dist, cutoff, horizon, points):
+    '''
+    Discretize the time between renewals `min(X, cutoff)` on a grid of
+    `points` steps up to the horizon, rounding to the nearest grid point.
+    Returns the step, and the probability masses of a renewal, a failure
+    renewal (X <= cutoff) and a maintenance renewal at every grid point.
+    '''
+    h = horizon/points
+    edges = (np.arange(points+1) + 0.5)*h
+    cdf = dist.cdf(np.minimum(edges, cutoff))
+    survival = 1 - dist.cdf(cutoff) if np.isfinite(cutoff) else 0.0
+    renewal = np.where(edges < cutoff, cdf, 1.0)
+    maintained = np.where(edges < cutoff, 0.0, survival)
+    return (h, np.diff(renewal, prepend=0), np.diff(cdf, prepend=0),
+            np.diff(maintained, prepend=0))
+
+
+@memoize_dist(maxsize=64)
+@timed()
+def renewal_moments(dist, cutoff, horizon, points=None):
+    '''
+    Solve the discretized renewal equation of age replacement at `cutoff`
+    by damped FFT convolution, for the expected failures and maintenances
+    of one component over time up to the horizon, with their variances and
+    covariance.
+
+    The renewal measure is U = 1/(1 - g) in the transform domain, and the
+    expected count of renewals of kind A is M_A = g_A * U. Second moments
+    follow from E[N_A N_B] = M_A [A = B] + (dM_A * M_B + dM_B * M_A).
+    Sequences are damped by r^k before the FFT so that the wrap-around of
+    the circular convolution is negligible.
+
+    Returns a DataFrame of `time`, `failures`, `maintenances`,
+    `failures_var`, `maintenances_var` and `covariance`.
+    '''
+    points = points or grid_points(dist, cutoff, horizon)
+    (h, p, pf, pm) = renewal_masses(dist, cutoff, horizon, points)
+    size = 2*(points+1)
+    r = DAMPING**(1/size)
+    damp = r**np.arange(points+1)
+    [p, pf, pm] = [np.fft.rfft(x*damp, size) for x in (p, pf, pm)]
+    u = 1/(1-p)
+    (mf, mm) = (pf*u, pm*u)
+
+    def inverse(x):
+        return np.cumsum(np.fft.irfft(x, size)[:points+1]/damp)
+
+    (ef, em) = (inverse(mf), inverse(mm))
+    ef2 = ef + 2*inverse(mf*mf)
+    em2 = em + 2*inverse(mm*mm)
+    efm = 2*inverse(mf*mm)
+    return pd.DataFrame({
+        'time': np.arange(points+1)*h,
+        'failures': ef,
+        'maintenances': em,
+        'failures_var': ef2 - ef**2,
+        'maintenances_var': em2 - em**2,
+        'covariance': efm - ef*em
+    })
+
+
+def expected_counts(dist, cutoff, noc, tlen, mtype='Component-wise',
+                    points=None):
+    '''
+    Expected failures and maintenances of `noc` independent components
+    over `tlen` hours each, with their variances and covariance, as the
+    Monte Carlo simulators count them. Fleetwide maintenance renews every
+    component each cycle, so cycles are independent runs of the renewal
+    process without maintenance, and the remainder only counts failures.
+
+    Returns the totals at `tlen` as a dictionary, and the totals over time
+    as a DataFrame.
+    '''
+    fields = ['failures', 'maintenances', 'failures_var',
+              'maintenances_var', 'covariance']
+    if mtype == 'Component-wise':
+        curve = renewal_moments(dist, cutoff, tlen, points).copy()
+    elif mtype == 'Fleetwide':
+        cycle = renewal_moments(dist, np.inf, min(cutoff, tlen), points)
+        time = np.linspace(0, tlen, len(cycle))
+        # Completed cycles and the time into the current cycle
+        done = np.floor(time/cutoff)
+        left = time - done*cutoff
+        curve = pd.DataFrame({'time': time})
+        for x in ['failures', 'failures_var']:
+            curve[x] = done*cycle[x].iloc[-1] + np.interp(
+                left, cycle['time'], cycle[x]
+            )
+        curve['maintenances'] = done
+        curve[['maintenances_var', 'covariance']] = 0.0
+    else:
+        raise ValueError(f'Unknown maintenance type {mtype}')
+    curve[fields] *= noc
+    return curve.iloc[-1][fields].to_dict(), curve
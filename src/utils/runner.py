@@ -0,0 +1,193 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+from scipy.stats import t as student_t
+from .profiling import timed
+from .sim import (
+    simulate_bycomponent_batch,
+    simulate_fleetwide_batch
+)
+
+
+# Trials per chunk, fixed so results do not depend on the number of workers
+CHUNK = 250
+
+SIMULATORS = {'Component-wise': simulate_bycomponent_batch,
+              'Fleetwide': simulate_fleetwide_batch}
+
+
+def split_trials(rept, chunk=CHUNK):
+    '''
+    Split trials into chunks of (start, size)
+    '''
+    return [(i, min(chunk, rept-i)) for i in range(0, rept, chunk)]
+
+
+def run_chunk(mtype, dist, cutoff, noc, tlen, n, seed, keep=False,
+              sampling='Plain', width=None):
+    '''
+    Simulate one chunk of trials with its own random stream
+    '''
+    rng = np.random.default_rng(seed)
+    return SIMULATORS[mtype](dist, cutoff, noc, tlen, n, rng, keep,
+                             sampling, width)
+
+
+def merge_chunks(results, chunks, noc):
+    '''
+    Merge chunk results in trial order, offsetting event rows by the first
+    trial of their chunk
+    '''
+    ms = np.concatenate([results[i][1] for i in range(len(chunks))])
+    fs = np.concatenate([results[i][2] for i in range(len(chunks))])
+    if results[0][0] is None:
+        return [None, ms, fs]
+    events = [results[i][0] for i in range(len(chunks))]
+    row = np.concatenate([ev[0] + start*noc
+                          for ev, (start, _) in zip(events, chunks)])
+    duration = np.concatenate([ev[1] for ev in events])
+    status = np.concatenate([ev[2] for ev in events])
+    return [(row, duration, status), ms, fs]
+
+
+@timed()
+def run_simulation(mtype, dist, cutoff, noc, tlen, rept, seed=None,
+                   workers=None, keep=False, callback=None, chunk=CHUNK,
+                   sampling='Plain', width=None):
+    '''
+    Run `rept` trials split into chunks across a process pool. Each chunk is
+    seeded with its own child of `SeedSequence(seed)`, so the results are
+    reproducible for a given seed whatever the number of workers. Sampling
+    other than `Plain` is applied within each chunk.
+
+    `callback(done, rept)` is called in the calling process as chunks finish.
+    Returns [events, maintenances, failures] as the batch simulators do.
+    '''
+    chunks = split_trials(rept, chunk)
+    seeds = np.random.SeedSequence(seed).spawn(len(chunks))
+    workers = min(workers or os.cpu_count() or 1, len(chunks))
+    results = {}
+    done = 0
+    if workers == 1:
+        for i, (_, n) in enumerate(chunks):
+            results[i] = run_chunk(mtype, dist, cutoff, noc, tlen, n,
+                                   seeds[i], keep, sampling, width)
+            done += n
+            if callback:
+                callback(done, rept)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(run_chunk, mtype, dist, cutoff, noc,
+                                       tlen, n, seeds[i], keep, sampling,
+                                       width): i
+                       for i, (_, n) in enumerate(chunks)}
+            for future in as_completed(futures):
+                i = futures[future]
+                results[i] = future.result()
+                done += chunks[i][1]
+                if callback:
+                    callback(done, rept)
+
+    return merge_chunks(results, chunks, noc)
+
+
+@timed()
+def iter_simulation(mtype, dist, cutoff, noc, tlen, max_rept, seed=None,
+                    workers=None, keep=False, chunk=CHUNK, sampling='Plain',
+                    width=None, start=0):
+    '''
+    Run trials in rounds of one chunk per worker, up to `max_rept` trials,
+    yielding the merged [events, maintenances, failures] of each round with
+    event rows numbered from the first trial overall. Chunks are seeded as
+    in `run_simulation`, so stopping after any round gives the first trials
+    of the full run, and resuming at trial `start` (a multiple of `chunk`)
+    gives the rest.
+    '''
+    if start % chunk:
+        raise ValueError(f'Cannot resume within a chunk of {chunk} trials')
+    sequence = np.random.SeedSequence(seed)
+    # Skip the seeds of the chunks already run
+    sequence.spawn(start//chunk)
+    workers = workers or os.cpu_count() or 1
+    executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 \
+        else None
+    try:
+        for first in range(start, max_rept, workers*chunk):
+            end = min(first + workers*chunk, max_rept)
+            chunks = [(first+i, n) for (i, n) in split_trials(end-first,
+                                                              chunk)]
+            seeds = sequence.spawn(len(chunks))
+            args = [(mtype, dist, cutoff, noc, tlen, n, seeds[i], keep,
+                     sampling, width) for i, (_, n) in enumerate(chunks)]
+            if executor is None:
+                results = [run_chunk(*x) for x in args]
+            else:
+                results = list(executor.map(run_chunk, *zip(*args)))
+            yield merge_chunks(results, chunks, noc)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+
+def replicate_groups(rept, sampling='Plain', chunk=CHUNK):
+    '''
+    Label the trials with independent replicates of the sampling: single
+    trials, antithetic pairs, or whole chunks for stratified (Latin
+    hypercube and Sobol) sampling. Every chunk has its own seed, hence its
+    own strata and Sobol scramble, so chunk means are independent.
+    '''
+    trial = np.arange(rept)
+    if sampling == 'Plain':
+        return trial
+    if sampling != 'Antithetic':
+        return trial//chunk
+    start = trial//chunk*chunk
+    j = trial - start
+    half = np.minimum(chunk, rept-start)//2
+    # Trial j of a chunk is paired with trial j+half
+    return start + np.where(j < 2*half, j - half*(j >= half), j)
+
+
+def estimate_mean(x, groups=None, level=0.95):
+    '''
+    Estimate the mean of simulated values with its confidence interval from
+    the spread of independent replicates `groups`, as labelled by
+    `replicate_groups`. The effective sample size is the number of plain
+    trials giving the same standard error. With a single replicate, trials
+    are taken as independent.
+    '''
+    x = np.asarray(x, dtype=float).ravel()
+    n = x.size
+    mean = x.mean()
+    var = x.var(ddof=1) if n > 1 else 0.0
+    groups = np.arange(n) if groups is None else groups
+    (_, inv) = np.unique(groups, return_inverse=True)
+    counts = np.bincount(inv)
+    k = counts.size
+    if k > 1:
+        means = np.bincount(inv, weights=x)/counts
+        se2 = k/(k-1)*np.sum((counts*(means-mean))**2)/n**2
+    else:
+        (k, se2) = (n, var/n)
+    se = np.sqrt(se2)
+    half = student_t.ppf((1+level)/2, max(k-1, 1))*se
+    return {'mean': float(mean), 'se': float(se),
+            'low': float(mean-half), 'high': float(mean+half),
+            'ess': float(var/se2) if se2 > 0 else float(n)}
+
+
+def estimate_quantile(x, q, level=0.95):
+    '''
+    Estimate a quantile of simulated values with the distribution-free
+    confidence interval given by order statistics, taking trials as
+    independent
+    '''
+    x = np.sort(np.asarray(x, dtype=float).ravel())
+    n = x.size
+    z = student_t.ppf((1+level)/2, max(n-1, 1))
+    spread = z*np.sqrt(n*q*(1-q))
+    low = int(np.clip(np.floor(n*q - spread), 0, n-1))
+    high = int(np.clip(np.ceil(n*q + spread), 0, n-1))
+    return {'value': float(np.quantile(x, q)), 'low': float(x[low]),
+            'high': float(x[high])}
@@ -0,0 +1,168 @@
+import base64
+import time
+import pandas as pd
+import streamlit as st
+from .data import SCHEMES
+from .io import (
+    has_parquet,
+    to_csv_gz,
+    to_parquet
+)
+from .utils import floor_magnitude
+
+
+def cost_section(inputs):
+    '''
+    Template for cost section of the page
+    '''
+    st.header('Costs')
+    st.info('Costs are for single failure occurrence/maintenance activity')
+    sfcost = st.number_input('Failure Cost', 0, 100000, 20000)
+    mcost = st.number_input('Maintenance Cost', 0, 100000, 3000)
+
+    inputs['sfcost'] = sfcost
+    inputs['mcost'] = mcost
+
+
+def download_section(df, label, name):
+    '''
+    Template for downloading a table as compressed CSV or Parquet
+    '''
+    formats = ['CSV (gzip)'] + (['Parquet'] if has_parquet() else [])
+    fmt = st.radio('Download format', formats)
+    if fmt == 'Parquet':
+        (data, ext, mime) = (to_parquet(df), 'parquet',
+                             'application/octet-stream')
+    else:
+        (data, ext, mime) = (to_csv_gz(df), 'csv.gz', 'application/gzip')
+    filename = st.text_input(f'Filename (e.g. {name}.{ext})',
+                             f'{name}.{ext}')
+
+    if hasattr(st, 'download_button'):
+        st.download_button(label, data, filename, mime)
+    else:
+        # Older Streamlit has no download button, link the compressed bytes
+        b64 = base64.b64encode(data).decode()
+        href = '''<a href="data:{};base64,{}"
+            download="{}">{}</a>'''
+        st.markdown(href.format(mime, b64, filename, label),
+                    unsafe_allow_html=True)
+
+
+def generation_section(dist):
+    '''
+    Template for generating toy data. Returns the arguments of
+    `generate_censored` and whether Generate is ticked. A checkbox, unlike
+    a button, stays ticked on reruns, and the seed regenerates the same
+    data.
+    '''
+    # Generation parameters
+    scale = st.number_input('Scale', 100, 1000000, 20000, 100)
+    shape = st.slider('Shape', 0.2, 5.0, 1.5, 0.01)
+    # Create distribution object
+    dgen = dist(a=1, loc=0, c=shape, scale=scale)
+    mag = floor_magnitude(dgen.ppf(0.99))
+
+    scheme = st.radio('Censoring Scheme', SCHEMES)
+    params = {'dist': dgen, 'scheme': scheme}
+    if scheme == 'Fixed cutoff':
+        params['cutoff'] = st.slider('Maintenance Interval', int(mag*0.2),
+                                     min([int(mag*10), 1000000]),
+                                     int(mag*0.9), 100)
+    elif scheme == 'Random censoring':
+        params['censor_mean'] = st.number_input('Mean Censoring Time', 100,
+                                                10000000, int(mag), 100)
+    elif scheme == 'Staggered entry':
+        params['study_length'] = st.number_input('Study Length (hours)', 100,
+                                                 10000000, int(mag), 100)
+
+    # Trials
+    params['rows'] = st.number_input('Rows to generate', 500, 10000000, 2500,
+                                     100)
+    params['random_state'] = st.number_input('Seed', 0, 2**31-1, 0,
+                                             key='generation-seed')
+    return params, st.checkbox('Generate')
+
+
+def performance_table(records, profile_text=None, caches=None):
+    '''
+    Show instrumented timings, the counters of memoized functions and the
+    cProfile statistics if given
+    '''
+    if not records:
+        st.write('No instrumented calls on this page yet')
+    else:
+        df = pd.DataFrame(records).set_index('name')
+        st.table(df[['calls', 'total', 'mean', 'max']])
+    if caches:
+        st.markdown('Memoized functions, over the server process')
+        st.table(pd.DataFrame.from_dict(caches, orient='index'))
+    if profile_text:
+        st.text(profile_text)
+
+
+def performance_section(records, profile_text=None, caches=None):
+    '''
+    Template for the collapsible panel of instrumented timings, falling back
+    to a checkbox on Streamlit versions without expanders
+    '''
+    expander = (getattr(st, 'expander', None) or
+                getattr(st, 'beta_expander', None))
+    if expander is not None:
+        with expander('Performance'):
+            performance_table(records, profile_text, caches)
+    elif st.checkbox('Show Performance'):
+        st.markdown('---')
+        st.header('Performance')
+        performance_table(records, profile_text, caches)
+
+
+def job_section(job, show=None, key='job', poll=0.5):
+    '''
+    Template for following a background job: its state and progress, a
+    button to cancel or resume it, and `show(job)` called on every poll to
+    render partial results. Polls until the job stops. A rerun only ends the
+    polling, the job carries on. Returns whether the job is done.
+
+    Jobs are shared by the sessions asking for the same computation, so
+    cancelling stops the job for every session following it.
+    '''
+    resume = False
+    if job.active and st.button('Cancel', key=f'{key}-cancel'):
+        job.cancel()
+    elif job.state in ['cancelled', 'failed']:
+        resume = True
+        if st.button('Resume', key=f'{key}-resume'):
+            job.resume()
+    status = st.empty()
+    bar = st.progress(0)
+    while True:
+        bar.progress(int(job.progress*100))
+        done = f'{job.done:,} of {job.total:,} ' if job.total > 1 else ''
+        status.markdown(f'''{job.label}: **{job.state}**, {done}in
+                        {job.elapsed:,.1f}s''')
+        if show:
+            show(job)
+        if not job.active:
+            break
+        time.sleep(poll)
+    if job.state == 'failed':
+        st.error(job.error)
+    if job.state == 'cancelled' and not resume:
+        # Cancelled while polling, offer to resume
+        st.button('Resume', key=f'{key}-resume')
+    return job.state == 'done'
+
+
+def jobs_section(records):
+    '''
+    Template for the table of background jobs of the server
+    '''
+    if not records:
+        return
+    st.markdown('---')
+    st.subheader('Background Jobs')
+    df = pd.DataFrame(records).set_index('job')
+    df['progress'] = (df['progress']*100).round().astype(int).astype(str) \
+        + '%'
+    st.table(df)
@@ -1,3 +1,32 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+try:
+    from scipy.stats import qmc
+except ImportError:
+    qmc = None
+from .profiling import timed, timer
+
+
+# Maximum number of lifetimes drawn at once by the batch engine
+MAX_BLOCK = 2**22
+# Ways of drawing the lifetimes of the batch engine
+SAMPLING = ['Plain', 'Antithetic', 'Latin hypercube', 'Sobol']
+# Maximum dimension of the Sobol sequence in SciPy
+SOBOL_DIM = 21201
+
+
+def get_rng(random_state=None):
+    '''
+    Helper function to get a NumPy generator from a seed or generator
+    '''
+    if isinstance(random_state, (np.random.Generator,
+                                 np.random.RandomState)):
+        return random_state
+    return np.random.default_rng(random_state)
+
+
 def simulate_fleetwide(dist, cutoff):
     '''
     Simulate failures assuming fleetwide maintenance for one maintenance
@@ -15,6 +44,7 @@ def simulate_fleetwide(dist, cutoff):
     return durations
 
 
+@timed()
 def get_durations_fleetwide(tlen, cutoff, dist):
     '''
     Simulate for (possibly) multiple maintenance cycles
@@ -32,6 +62,7 @@ def get_durations_fleetwide(tlen, cutoff, dist):
     return durations
 
 
+@timed()
 def simulate_bycomponent(dist, cutoff, noc, tlen):
     trials = []
     maintenances = []
@@ -57,3 +88,273 @@ def simulate_bycomponent(dist, cutoff, noc, tlen):
         maintenances.append(maintenance)
         failures.append(failure)
     return [trials, maintenances, failures]
+
+
+def has_sobol():
+    '''
+    Check if SciPy provides Sobol sequences (SciPy 1.7 and above)
+    '''
+    return qmc is not None
+
+
+def draw_uniforms(rept, per_trial, width, sampling, rng):
+    '''
+    Draw uniforms of shape (rept*per_trial, width) for trial-major rows, the
+    k-th column feeding the k-th lifetime of every row:
+
+       1. `Antithetic`: the second half of the trials mirrors the first
+       half with 1-u, an odd trial left over being drawn plainly
+       2. `Latin hypercube`: every column has exactly one row in each of
+       the equal strata of [0, 1)
+       3. `Sobol`: every trial is one point of a scrambled Sobol sequence
+       of dimension `per_trial*width`, split across its rows, so the
+       components of a trial are not consecutive (correlated) points
+    '''
+    rows = rept*per_trial
+    if sampling == 'Antithetic':
+        u = rng.random((rows, width))
+        half = rept//2*per_trial
+        u[half:2*half] = 1 - u[:half]
+    elif sampling == 'Latin hypercube':
+        strata = np.argsort(rng.random((width, rows)), axis=1).T
+        u = (strata + rng.random((rows, width)))/rows
+    elif sampling == 'Sobol':
+        if not has_sobol():
+            raise ValueError('Sobol sampling requires SciPy 1.7 or above')
+        if per_trial*width > SOBOL_DIM:
+            raise ValueError(f'Sobol sampling supports at most {SOBOL_DIM} '
+                             'lifetimes per trial')
+        sampler = qmc.Sobol(per_trial*width, scramble=True, seed=rng)
+        with warnings.catch_warnings():
+            # Balance is only guaranteed for powers of 2
+            warnings.simplefilter('ignore', UserWarning)
+            u = sampler.random(rept).reshape(rows, width)
+    else:
+        raise ValueError(f'Unknown sampling {sampling}')
+    return u
+
+
+def trial_uniforms(dist, cutoff, horizon, rept, per_trial, sampling, rng,
+                   width=None):
+    '''
+    Draw the uniforms of the first lifetimes of every row for a sampling
+    other than `Plain`, bounded by `MAX_BLOCK`. Lifetimes beyond the drawn
+    columns are sampled plainly. Fixing `width` keeps the same numbers for
+    different cutoffs (common random numbers).
+    '''
+    if sampling == 'Plain':
+        return None
+    rows = rept*per_trial
+    width = width or block_width(dist, cutoff, horizon)
+    width = min(width, max(1, MAX_BLOCK//max(rows, 1)))
+    if sampling == 'Sobol':
+        # One point per trial, covering the lifetimes of all its rows
+        width = min(width, SOBOL_DIM//per_trial)
+        if width < 1:
+            raise ValueError(f'Sobol sampling supports at most {SOBOL_DIM} '
+                             f'rows per trial, not {per_trial}')
+    return draw_uniforms(rept, per_trial, width, sampling, rng)
+
+
+def block_width(dist, cutoff, horizon):
+    '''
+    Guess the number of renewals needed to cover the horizon, used as the
+    width of the blocks drawn by the batch engine
+    '''
+    mean = min(dist.mean(), cutoff)
+    if not np.isfinite(mean) or mean <= 0:
+        return 16
+    return int(np.ceil(1.25*horizon/mean)) + 4
+
+
+@timed()
+def simulate_renewals(dist, cutoff, horizon, rows, random_state=None,
+                      keep=False, uniforms=None, width=None):
+    '''
+    Simulate `rows` independent renewal processes at once, with lifetimes
+    truncated (maintained) at the cutoff. An event is counted if it ends
+    strictly before the horizon, as in `simulate_bycomponent`.
+
+    Lifetimes are over-drawn in blocks for all active rows, and rows that
+    have not reached the horizon yet are topped up with another block.
+
+    Given `uniforms` of shape (rows, k), the first k lifetimes of each row
+    are their inverse CDF instead of plain draws. Given a block `width`,
+    every block has that width and the rows are chunked by it, so calls
+    with different cutoffs draw the same lifetimes (common random numbers).
+
+    Returns failure and maintenance counts per row, and the counted events
+    as flat arrays (row, duration, status) ordered by row if `keep`.
+    '''
+    rng = get_rng(random_state)
+
+    def draw(active, col, w):
+        if uniforms is None or col >= uniforms.shape[1]:
+            with timer('rvs'):
+                return dist.rvs(size=(active.size, w), random_state=rng)
+        u = uniforms[active, col:col+w]
+        with timer('ppf'):
+            out = dist.ppf(u)
+        if u.shape[1] < w:
+            with timer('rvs'):
+                rest = dist.rvs(size=(active.size, w-u.shape[1]),
+                                random_state=rng)
+            out = np.hstack([out, rest])
+        return out
+
+    failures = np.zeros(rows, dtype=np.int64)
+    maintenances = np.zeros(rows, dtype=np.int64)
+    events = []
+    fixed = width is not None
+    width = width or block_width(dist, cutoff, horizon)
+    # Process rows in chunks to bound the memory used by a block
+    step = max(1, MAX_BLOCK//width)
+    for start in range(0, rows, step):
+        active = np.arange(start, min(start+step, rows))
+        elapsed = np.zeros(active.size)
+        w = width
+        col = 0
+        while active.size:
+            draws = draw(active, col, w)
+            col += w
+            maintained = draws > cutoff
+            draws = np.where(maintained, cutoff, draws)
+            ends = elapsed[:, None] + np.cumsum(draws, axis=1)
+            counted = ends < horizon
+            failures[active] += np.count_nonzero(counted & ~maintained,
+                                                 axis=1)
+            maintenances[active] += np.count_nonzero(counted & maintained,
+                                                     axis=1)
+            if keep:
+                r, k = np.nonzero(counted)
+                events.append((active[r], draws[r, k],
+                               (~maintained[r, k]).astype(np.int8)))
+            # Keep rows which have not reached the horizon
+            elapsed = ends[:, -1]
+            unfinished = elapsed < horizon
+            active = active[unfinished]
+            elapsed = elapsed[unfinished]
+            if active.size and not fixed:
+                # Top up with a block sized on the largest time left
+                mean = draws.mean()
+                w = int(np.ceil(1.25*(horizon-elapsed.min())/mean)) + 4
+                w = min(w, max(1, MAX_BLOCK//active.size))
+
+    if not keep:
+        return [None, maintenances, failures]
+
+    if events:
+        row, duration, status = [np.concatenate(x) for x in zip(*events)]
+        order = np.argsort(row, kind='stable')
+        events = (row[order], duration[order], status[order])
+    else:
+        events = (np.zeros(0, dtype=np.int64), np.zeros(0),
+                  np.zeros(0, dtype=np.int8))
+    return [events, maintenances, failures]
+
+
+@timed()
+def simulate_bycomponent_batch(dist, cutoff, noc, tlen, rept,
+                               random_state=None, keep=False,
+                               sampling='Plain', width=None):
+    '''
+    Vectorized version of `simulate_bycomponent` for `rept` repeats at once,
+    with lifetimes drawn as given by `sampling`.
+    Maintenance and failure counts are returned with shape (rept, noc).
+    Counted events are returned as flat arrays (row, duration, status) if
+    `keep`, where row is `trial*noc + component`.
+    '''
+    rng = get_rng(random_state)
+    uniforms = trial_uniforms(dist, cutoff, tlen, rept, noc, sampling, rng,
+                              width)
+    [events, maintenances, failures] = simulate_renewals(
+        dist, cutoff, tlen, rept*noc, rng, keep, uniforms, width
+    )
+    return [events, maintenances.reshape(rept, noc),
+            failures.reshape(rept, noc)]
+
+
+@timed()
+def events_to_frame(events, noc):
+    '''
+    Convert flat events from the batch engine into a columnar DataFrame of
+    (trial_id, component_id, event_idx, duration, status) with typed columns
+    '''
+    (row, duration, status) = events
+    # Position of each event within its (trial, component) row
+    first = np.r_[0, np.flatnonzero(np.diff(row)) + 1]
+    starts = np.repeat(first, np.diff(np.r_[first, len(row)]))
+    return pd.DataFrame({
+        'trial_id': (row//noc).astype(np.int32),
+        'component_id': (row % noc).astype(np.int32),
+        'event_idx': (np.arange(len(row)) - starts).astype(np.int32),
+        'duration': duration.astype(np.float64),
+        'status': status.astype(np.int8)
+    })
+
+
+@timed()
+def simulate_fleetwide_batch(dist, cutoff, noc, tlen, rept,
+                             random_state=None, keep=False,
+                             sampling='Plain', width=None):
+    '''
+    Vectorized version of `get_durations_fleetwide` for `noc` components and
+    `rept` repeats at once. Every maintenance cycle of every component and
+    trial is a row of the batch engine, with lifetimes left untruncated and
+    the cycle length as the horizon. The remainder cycle only counts
+    failures, as in `get_durations_fleetwide`. Lifetimes are drawn as
+    given by `sampling`.
+
+    Maintenance and failure counts are returned with shape (rept, noc).
+    Events are returned as flat arrays (row, duration, status) if `keep`,
+    where row is `trial*noc + component`.
+    '''
+    rng = get_rng(random_state)
+    cycles = int(tlen/cutoff)
+    remainder = tlen % cutoff
+    units = rept*noc
+    failures = np.zeros(units, dtype=np.int64)
+    # Events with their (cycle, kind) sorting keys, maintenance closes a cycle
+    events = []
+    if cycles:
+        uniforms = trial_uniforms(dist, np.inf, cutoff, rept, noc*cycles,
+                                  sampling, rng, width)
+        [ev, _, f] = simulate_renewals(dist, np.inf, cutoff, units*cycles,
+                                       rng, keep, uniforms, width)
+        failures += f.reshape(units, cycles).sum(axis=1)
+        if keep:
+            (row, duration, status) = ev
+            used = np.bincount(row, weights=duration,
+                               minlength=units*cycles)
+            mrow = np.arange(units*cycles)
+            events.append((row//cycles, duration, status, row % cycles,
+                           np.zeros(row.size, dtype=np.int8)))
+            events.append((mrow//cycles, cutoff-used,
+                           np.zeros(mrow.size, dtype=np.int8),
+                           mrow % cycles, np.ones(mrow.size, dtype=np.int8)))
+    if remainder > 0:
+        uniforms = trial_uniforms(dist, np.inf, remainder, rept, noc,
+                                  sampling, rng, width)
+        [ev, _, f] = simulate_renewals(dist, np.inf, remainder, units, rng,
+                                       keep, uniforms, width)
+        failures += f
+        if keep:
+            (row, duration, status) = ev
+            events.append((row, duration, status,
+                           np.full(row.size, cycles),
+                           np.zeros(row.size, dtype=np.int8)))
+    maintenances = np.full((rept, noc), cycles, dtype=np.int64)
+    failures = failures.reshape(rept, noc)
+
+    if not keep:
+        return [None, maintenances, failures]
+
+    if events:
+        row, duration, status, cycle, kind = [np.concatenate(x)
+                                              for x in zip(*events)]
+        order = np.lexsort((kind, cycle, row))
+        events = (row[order], duration[order], status[order])
+    else:
+        events = (np.zeros(0, dtype=np.int64), np.zeros(0),
+                  np.zeros(0, dtype=np.int8))
+    return [events, maintenances, failures]
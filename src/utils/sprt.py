@@ -0,0 +1,142 @@
+import numpy as np
+import pandas as pd
+from .profiling import timed
+
+
+# Rows of cumulative history kept for display, decimated beyond twice as
+# many so the memory does not grow with the data
+KEEP = 10000
+
+
+class SequentialTest:
+    '''
+    Incremental Sequential Probability Ratio Test (SPRT) of the specified
+    MTBF `m0` against `m0/d` with exponential failure times. Records are
+    accepted one at a time or in batches, and the log-likelihood ratio is
+    tracked in log space until it crosses one of the boundaries `lb`
+    (accept) or `ub` (reject).
+
+    With `keep`, the cumulative duration, failures and log-likelihood ratio
+    of the rows up to the decision are kept for display: every row of short
+    tests, then every `stride` rows, the stride doubling whenever more than
+    twice `KEEP` rows are kept, and always the decision row.
+    '''
+    def __init__(self, lb, ub, d, m0, keep=False):
+        self.log_lb = np.log(lb)
+        self.log_ub = np.log(ub)
+        self.log_d = np.log(d)
+        self.rate = (1-d)/m0
+        self.keep = keep
+        self.rows = 0
+        self.duration = 0.0
+        self.failures = 0
+        self.decision = None
+        self.index = None
+        self.history = []
+        self.stride = 1
+        self.kept = 0
+
+    @property
+    def log_ratio(self):
+        return self.failures*self.log_d + self.duration*self.rate
+
+    def update(self, durations, status):
+        '''
+        Update the test with a batch of records, ignoring records after the
+        decision. Returns the decision, 'accept', 'reject' or None.
+        '''
+        if self.decision is not None:
+            return self.decision
+        durations = np.atleast_1d(durations)
+        status = np.atleast_1d(status)
+        duration = self.duration + np.cumsum(durations)
+        failures = self.failures + np.cumsum(status)
+        llr = failures*self.log_d + duration*self.rate
+        crossed = (llr < self.log_lb) | (llr > self.log_ub)
+        n = len(durations)
+        if crossed.any():
+            n = int(np.argmax(crossed)) + 1
+            self.decision = 'accept' if llr[n-1] < self.log_lb else 'reject'
+            self.index = self.rows + n - 1
+        if self.keep:
+            self.remember(np.arange(self.rows, self.rows+n), duration[:n],
+                          failures[:n], llr[:n])
+        if n:
+            self.duration = float(duration[n-1])
+            self.failures = int(failures[n-1])
+        self.rows += n
+        return self.decision
+
+    def remember(self, rows, *columns):
+        '''
+        Keep the rows of a batch on the stride, and the decision row
+        '''
+        take = (rows % self.stride == 0) | (rows == self.index)
+        self.history.append((rows[take],) + tuple(x[take] for x in columns))
+        self.kept += int(take.sum())
+        if self.kept > 2*KEEP:
+            # Thin what is kept to every other point of the stride
+            self.stride *= 2
+            history = [np.concatenate(x) for x in zip(*self.history)]
+            take = ((history[0] % self.stride == 0) |
+                    (history[0] == self.index))
+            self.history = [tuple(x[take] for x in history)]
+            self.kept = int(take.sum())
+
+    def cumulative(self):
+        '''
+        Get the kept cumulative duration, failures (`status`) and
+        log-likelihood ratio as a DataFrame indexed by row
+        '''
+        if not self.history:
+            return pd.DataFrame(columns=['duration', 'status', 'log_ratio'],
+                                index=pd.Index([], name='row'))
+        (row, duration, failures, llr) = [np.concatenate(x)
+                                          for x in zip(*self.history)]
+        return pd.DataFrame({'duration': duration, 'status': failures,
+                             'log_ratio': llr},
+                            index=pd.Index(row, name='row'))
+
+
+@timed()
+def run_sequential_test(test, chunks):
+    '''
+    Feed chunks of (durations, status) to the test, stopping as soon as a
+    decision is reached so the rest of the stream is never read
+    '''
+    for (durations, status) in chunks:
+        if test.update(durations, status) is not None:
+            break
+    return test
+
+
+@timed()
+def oc_curves(alpha, beta, d, m0, noc, resolution=50, hspace=(-2, 2)):
+    '''
+    Compute the operating characteristic (OC) and expected test time of one
+    or many test plans in one batched call. Parameters may be arrays with
+    one value per plan, and the curves are evaluated on `resolution` points
+    of h in `hspace`, with the limit at h=0 computed analytically.
+
+    Returns h, and the actual MTBF `m`, probability of acceptance `Pa` and
+    expected time to decision `Et` with shape (plans, resolution).
+    '''
+    [alpha, beta, d, m0] = [np.asarray(x, dtype=float).reshape(-1, 1)
+                            for x in (alpha, beta, d, m0)]
+    correction_factor = (d+1)/(2*d)
+    a = np.log((1-beta)/alpha*correction_factor)  # log A
+    b = np.log(beta/(1-alpha))  # log B
+    g = np.log(d)
+    h = np.linspace(hspace[0], hspace[1], resolution)
+    zero = np.abs(h) < 1e-8
+    hs = np.where(zero, 1, h)
+    # MTBF at which the test behaves as the plan with exponent h
+    m = np.where(zero, m0*g/(d-1), m0*np.expm1(hs*g)/(hs*(d-1)))
+    pa = np.where(zero, a/(a-b),
+                  np.expm1(hs*a)/(np.expm1(hs*a) - np.expm1(hs*b)))
+    # Expected number of failures to decision
+    with np.errstate(invalid='ignore', divide='ignore'):
+        er = np.where(zero, -a*b/g**2,
+                      m0*(pa*(a-b) - a)/(m*(d-1) - m0*g))
+    et = m/noc*er
+    return h, m, pa, et
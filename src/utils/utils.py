@@ -1,8 +1,14 @@
 import numpy as np
 import pandas as pd
 from scipy.integrate import quad
+from scipy.optimize import minimize_scalar
 from scipy.special import gamma, gammainc
-import streamlit as st
+from .cache import (
+    dist_key,
+    memoize_dist
+)
+from .profiling import timed
+from .sprt import oc_curves
 
 
 def analytical_mtbf(dist, cutoff, **kwargs):
@@ -15,6 +21,7 @@ def analytical_mtbf(dist, cutoff, **kwargs):
     return scale/c*gammainc(1/c, (cutoff/scale)**c)*gamma(1/c)/dist.cdf(cutoff)
 
 
+@timed()
 def calculate(dist, cutoff, cost=False, **kwargs):
     '''
     Calculate the cost of maintenance plan given parameters
@@ -30,7 +37,7 @@ def calculate(dist, cutoff, cost=False, **kwargs):
         return oh/mtbf*sfcost + mc*mcost
     else:
         mtbf = {'maintenance': numerical_mtbf(dist, cutoff),
-                'no_maintenance': dist.mean()}
+                'no_maintenance': mean_life(dist)}
         # Maintenance count
         mc = (mtbf['maintenance']-truncated_ev(dist, cutoff))
         mc = mc/(mtbf['maintenance']*cutoff)*oh
@@ -52,17 +59,42 @@ def calculate(dist, cutoff, cost=False, **kwargs):
     return out
 
 
-def cost_section(inputs):
+@timed()
+def cost_curve(dist, cutoffs, **kwargs):
     '''
-    Template for cost section of the page
+    Calculate the yearly cost of maintenance plans for an array of cutoffs at
+    once, equivalent to `calculate(dist, cutoff, cost=True, **kwargs)`
     '''
-    st.header('Costs')
-    st.info('Costs are for single failure occurrence/maintenance activity')
-    sfcost = st.number_input('Failure Cost', 0, 100000, 20000)
-    mcost = st.number_input('Maintenance Cost', 0, 100000, 3000)
+    oh = kwargs.get('oh')
+    sfcost = kwargs.get('sfcost')
+    mcost = kwargs.get('mcost')
+
+    cutoffs = np.asarray(cutoffs, dtype=float)
+    # Expected cycle length, each cycle ends in a failure or a maintenance
+    cycle = cycle_length(dist, cutoffs)
+    return oh*(sfcost*dist.cdf(cutoffs) + mcost*dist.sf(cutoffs))/cycle
+
 
-    inputs['sfcost'] = sfcost
-    inputs['mcost'] = mcost
+@memoize_dist()
+@timed()
+def cycle_length(dist, cutoffs, points=4097):
+    '''
+    Compute the expected cycle length under age replacement, the integral of
+    the survival function from 0 to the cutoff, for an array of cutoffs.
+    Weibull uses the incomplete gamma closed form, other distributions use
+    cumulative trapezoid integration on a grid shared by all cutoffs.
+    '''
+    cutoffs = np.asarray(cutoffs, dtype=float)
+    params = weibull_params(dist)
+    if params is not None:
+        (c, scale) = params
+        return scale/c*gamma(1/c)*gammainc(1/c, (cutoffs/scale)**c)
+
+    grid = np.union1d(np.linspace(0, cutoffs.max(), points), cutoffs)
+    sf = dist.sf(grid)
+    integral = np.concatenate([[0], np.cumsum(np.diff(grid)*(sf[1:] +
+                                                             sf[:-1])/2)])
+    return integral[np.searchsorted(grid, cutoffs)]
 
 
 def floor_magnitude(x):
@@ -72,47 +104,82 @@ def floor_magnitude(x):
     return np.power(10, int(np.log10(x)))
 
 
-def get_test_properties(alpha, beta, d, m0, noc):
+def get_test_properties(alpha, beta, d, m0, noc, resolution=50):
     '''
     Get test properties of a given test plan
     '''
-    correction_factor = (d+1)/(2*d)
-    ub = (1-beta)/alpha*correction_factor  # A
-    lb = beta/(1-alpha)  # B
-    hspace = np.linspace(-2, 2, 50)
-    m = {h: m0*(np.power(d, h)-1)/(h*(d-1)) for h in hspace}
-    pa = {h: (np.power(ub, h)-1)/(np.power(ub, h) - np.power(lb, h))
-          for h in hspace}
-    er = {h: m0*(pa[h]*(np.log(ub)-np.log(lb)) - np.log(ub)) /
-          (m[h]*(d-1) - m0*np.log(d)) for h in hspace}
-    et = {h: m[h]/noc*er[h] for h in hspace}
-    df = pd.DataFrame([m, pa, et], index=['m', 'Pa', 'Et'], columns=hspace).T
-    df.reset_index(inplace=True)
+    (h, m, pa, et) = oc_curves(alpha, beta, d, m0, noc, resolution)
+    df = pd.DataFrame({'index': h, 'm': m[0], 'Pa': pa[0], 'Et': et[0]})
 
     return df
 
 
+@timed()
 def log_likelihood(df, dist, params):
     '''
-    Calculate the log-likelihood of data given censoring
+    Calculate the log-likelihood of data given censoring. Data may be a
+    DataFrame or the mapped columns of a binary dataset.
     '''
-    durations = df['duration'].values
-    status = df['status'].values
+    durations = np.asarray(df['duration'])
+    status = np.asarray(df['status'])
     d = dist(a=1, loc=0, c=params[0], scale=params[1])
-    # Hazard function
-    hf = d.pdf(durations)/d.sf(durations)
-    sf = d.sf(durations)
-    return sum(np.log(np.power(hf, status)*sf))
+    # Log hazard is the log PDF minus the log survival function
+    logsf = d.logsf(durations)
+    return np.sum(status*(d.logpdf(durations) - logsf) + logsf)
 
 
+@memoize_dist()
+@timed()
+def mean_life(dist):
+    '''
+    Compute the mean life, with the closed form for Weibull
+    '''
+    params = weibull_params(dist)
+    if params is not None:
+        (c, scale) = params
+        return scale*gamma(1+1/c)
+    return dist.mean()
+
+
+@memoize_dist()
+@timed()
 def numerical_mtbf(dist, cutoff):
     '''
-    Compute the MTBF with numerical integration
+    Compute the MTBF with numerical integration, or with the incomplete gamma
+    closed form for Weibull
     '''
+    if weibull_params(dist) is not None:
+        return cycle_length(dist, cutoff)/dist.cdf(cutoff)
     integral = truncated_ev(dist, cutoff)
     return integral - cutoff*(1-1/dist.cdf(cutoff))
 
 
+@timed()
+def optimize_interval(dist, bounds, grid=512, **kwargs):
+    '''
+    Find the cost-optimal maintenance interval within bounds by a grid
+    search over the cost curve, refined with a bounded search between the
+    neighbours of the best grid point.
+
+    Returns a dictionary with the optimum `x`, its `cost`, whether it is an
+    interior optimum (`success`) and the cost `curve` as a DataFrame.
+    '''
+    cutoffs = np.geomspace(bounds[0], bounds[1], grid)
+    costs = cost_curve(dist, cutoffs, **kwargs)
+    i = int(np.nanargmin(costs))
+    curve = pd.DataFrame({'interval': cutoffs, 'cost': costs})
+    # Cost still decreasing at the bounds, no interior optimum
+    if i in [0, grid-1]:
+        return {'x': cutoffs[i], 'cost': costs[i], 'success': False,
+                'nfev': grid, 'curve': curve}
+
+    opt = minimize_scalar(lambda x: cost_curve(dist, x, **kwargs),
+                          bounds=(cutoffs[i-1], cutoffs[i+1]),
+                          method='bounded')
+    return {'x': opt['x'], 'cost': opt['fun'], 'success': True,
+            'nfev': grid + opt['nfev'], 'curve': curve}
+
+
 def test_inputs(state, params):
     '''
     Check if test plan inputs fulfil criteria
@@ -128,8 +195,32 @@ def test_inputs(state, params):
     return 'pass'
 
 
+@memoize_dist()
+@timed()
 def truncated_ev(dist, cutoff):
     '''
     Helper function to calculate truncated (conditional) expected value.
-    '''
-    return quad(lambda x: x*dist.pdf(x), 0, cutoff)[0]
+    Weibull uses the incomplete gamma closed form, other distributions use
+    numerical integration.
+    '''
+    params = weibull_params(dist)
+    if params is not None:
+        (c, scale) = params
+        partial = scale*gamma(1+1/c)*gammainc(1+1/c, (cutoff/scale)**c)
+        return partial/dist.cdf(cutoff)
+    return quad(lambda x: x*dist.pdf(x), 0, cutoff)[0]/dist.cdf(cutoff)
+
+
+def weibull_params(dist):
+    '''
+    Get (shape, scale) of a frozen two-parameter Weibull distribution, or
+    None if the distribution has no Weibull closed form
+    '''
+    (name, shapes, scale, loc) = dist_key(dist)
+    if loc != 0:
+        return None
+    if name == 'exponweib' and shapes[0] == 1:
+        return (shapes[1], scale)
+    if name == 'weibull_min':
+        return (shapes[0], scale)
+    return None
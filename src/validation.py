@@ -1,7 +1,14 @@
-import io
 import pandas as pd
 import streamlit as st
+from reliability.core import (
+    DISTRIBUTIONS,
+    generate_censored,
+    iter_failures,
+    sequential_test,
+    test_bounds
+)
 from utils.io import img_to_bytes
+from utils.sections import generation_section
 from utils.utils import test_inputs
 from utils.plotting import (
     plot_properties, plot_sequential_test
@@ -77,24 +84,39 @@ def validation():
     tid = st.selectbox('Test ID', [x[0] for x in state])
     if tid:
         st.subheader('Test Properties')
-        plot_properties(state, tid, noc, oh)
+        compare = st.multiselect('Compare with', [x[0] for x in state
+                                                  if x[0] != tid])
+        plot_properties(state, tid, noc, oh, compare)
 
     st.subheader('Upload')
     st.markdown('''Upload test data with format as specified in the Fitter
                 page. In the page, you can also generate and download the toy
-                data. You can upload the toy data here.''')
-    file_csv = st.file_uploader('''Upload Test Data in CSV format''',
-                                type=['csv'])
+                data. You can upload the toy data here, or generate it
+                directly.''')
+    chunks = None
+    gu = st.radio('Generate test data or upload?', ['Upload', 'Generate'])
+    if gu == 'Upload':
+        file_csv = st.file_uploader('''Upload Test Data in CSV format or as
+                                    a binary dataset''',
+                                    type=['csv', 'rfd'])
+        if file_csv:
+            chunks = iter_failures(file_csv)
+    elif gu == 'Generate':
+        params, generate = generation_section(DISTRIBUTIONS['weibull'])
+        if generate:
+            chunks = generate_censored(**params)
 
     # Once uploaded and test plan chosen
     sel = st.selectbox('Use Test Plan?', ['No']+[x[0] for x in state])
     st.subheader('Results')
-    if file_csv:
-        encoded = file_csv.read().encode('utf8')
-        df = pd.read_csv(io.BytesIO(encoded))
+    if chunks:
         if sel != 'No':
             alpha, beta, d, m0 = [x[1:] for x in state if x[0] == sel][0]
-        correction_factor = (d+1)/(2*d)
-        ub = (1-beta)/alpha*correction_factor
-        lb = beta/(1-alpha)
-        plot_sequential_test(df, (lb, ub, d, m0, oh, noc))
+        (lb, ub) = test_bounds(alpha, beta, d)
+        # Stream the data, stopping at the decision row
+        try:
+            test = sequential_test(chunks, alpha, beta, d, m0, keep=True)
+        except ValueError as e:
+            st.error(str(e))
+            return
+        plot_sequential_test(test, (lb, ub, d, m0, oh, noc))
@@ -0,0 +1,7 @@
+import os
+import sys
+
+
+# Modules are imported from src, as the app runs, without the result cache
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+os.environ['RELIABILITY_CACHE'] = '0'
@@ -0,0 +1,18 @@
+import numpy as np
+
+from utils.bootstrap import bootstrap_weibull
+
+
+def test_run_to_failure_replicates_left_out():
+    # Shapes near 1: many replicates do not pay for maintenance
+    rng = np.random.default_rng(1)
+    lifetimes = 20000*rng.weibull(1.1, 40)
+    durations = np.minimum(lifetimes, 25000)
+    status = (lifetimes < 25000).astype(float)
+    boot = bootstrap_weibull(durations, status, 5000, 20000, 3000, reps=200,
+                             seed=0)
+    replicates = boot['replicates']
+    fitted = replicates[replicates['success']]
+    assert boot['run_to_failure'] == (~fitted['optimized']).sum() > 0
+    assert fitted.loc[~fitted['optimized'], 'interval'].isna().all()
+    assert np.isfinite(boot['intervals'].loc['interval']).all()
@@ -0,0 +1,27 @@
+import json
+
+from scipy.stats import exponweib
+
+from reliability import cli, core
+
+
+# Example config of the README
+CONFIG = {'distribution': {'name': 'weibull', 'shape': 1.5, 'scale': 20000},
+          'cutoff': 18000, 'noc': 10, 'oh': 5000, 'sfcost': 20000,
+          'mcost': 3000, 'years': 3, 'rept': 2500,
+          'mtype': 'Component-wise', 'seed': 0, 'workers': 1}
+
+
+def test_simulate_matches_core(tmp_path, capsys):
+    path = tmp_path / 'config.json'
+    path.write_text(json.dumps(CONFIG))
+    cli.main(['simulate', str(path)])
+    out = json.loads(capsys.readouterr().out)
+
+    dist = exponweib(a=1, c=1.5, scale=20000)
+    sim = core.simulate(dist, 18000, 10, 3*5000, 2500, 20000, 3000,
+                        mtype='Component-wise', seed=0, workers=1)
+    assert out['estimate']['mean'] == sim['estimate']['mean']
+    assert out['failures'] == core.summarize(sim['failures']['count'])
+    # Ten components over 15000 hours each
+    assert 5.5 < sim['failures']['count'].mean() < 6
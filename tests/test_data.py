@@ -0,0 +1,18 @@
+import pytest
+from scipy.stats import exponweib
+
+from utils.data import generate_censored
+
+
+DIST = exponweib(a=1, c=1.5, scale=20000)
+
+
+@pytest.mark.parametrize('kwargs', [
+    {'scheme': 'Fixed cutoff'},
+    {'scheme': 'Fixed cutoff', 'cutoff': float('nan')},
+    {'scheme': 'Random censoring', 'censor_mean': -5},
+    {'scheme': 'Staggered entry', 'study_length': '40000'}
+])
+def test_invalid_censoring_parameters(kwargs):
+    with pytest.raises(ValueError):
+        next(generate_censored(DIST, 10, **kwargs))
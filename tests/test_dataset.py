@@ -0,0 +1,34 @@
+import numpy as np
+import pytest
+
+from utils.dataset import (
+    iter_failures,
+    load_failures,
+    open_dataset,
+    write_dataset
+)
+
+
+def test_invalid_datasets_are_rejected(tmp_path):
+    path = str(tmp_path / 'data.rfd')
+    write_dataset(path, [{'duration': np.array([1.0, 2.0, 3.0]),
+                          'status': np.array([1, 0, 1])}])
+    assert load_failures(path)[1]['failures'] == 2
+    # A status of 2 written by another tool
+    (_, header) = open_dataset(path)
+    offset = [x['offset'] for x in header['columns']
+              if x['name'] == 'status'][0]
+    with open(path, 'r+b') as f:
+        f.seek(offset)
+        f.write(b'\x02')
+    with pytest.raises(ValueError):
+        load_failures(path)
+    with pytest.raises(ValueError):
+        list(iter_failures(path))
+
+
+def test_invalid_chunks_are_not_written(tmp_path):
+    with pytest.raises(ValueError):
+        write_dataset(str(tmp_path / 'data.rfd'),
+                      [{'duration': np.array([-1.0]),
+                        'status': np.array([1])}])
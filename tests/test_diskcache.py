@@ -0,0 +1,70 @@
+import pytest
+from scipy.stats import exponweib
+
+from reliability.core import simulate, simulate_until
+from utils import diskcache
+
+
+DIST = exponweib(a=1, c=1.5, scale=20000)
+# Trials of 10 components over 15000 hours, failures 20000, maintenance 3000
+CASE = (10000, 10, 15000)
+COSTS = (20000, 3000)
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    monkeypatch.setitem(diskcache.STATE, 'enabled', True)
+    monkeypatch.setitem(diskcache.STATE, 'path',
+                        str(tmp_path / 'cache.sqlite'))
+    return diskcache
+
+
+def test_hit_reports_progress(cache):
+    runs = []
+    for _ in range(2):
+        calls = []
+        simulate(DIST, *CASE, 1000, *COSTS, seed=0, workers=1,
+                 callback=lambda done, n: calls.append((done, n)))
+        runs.append(calls)
+    assert cache.info()['entries'] == 1
+    assert runs[1] == [(1000, 1000)] == runs[0][-1:]
+
+
+def test_hit_replays_running_estimates(cache):
+    runs = []
+    for _ in range(2):
+        history = []
+        out = simulate_until(DIST, *CASE, *COSTS, target=0.02, seed=0,
+                             workers=1, callback=history.append)
+        runs.append(history)
+    assert len(runs[1]) == len(runs[0]) == len(out['history']) > 1
+    assert runs[1][-1] == runs[0][-1]
+
+
+def test_stale_entries_are_misses(cache):
+    calls = []
+
+    @cache.disk_cache()
+    def double(x):
+        calls.append(x)
+        return 2*x
+    assert double(1) == 2
+    # An entry pickled from a module that no longer exists
+    con = cache.connect()
+    with con:
+        con.execute('UPDATE entries SET value = ?',
+                    (b'\x80\x04\x95\x0c\x00\x00\x00\x00\x00\x00\x00\x8c'
+                     b'\x07missing\x94\x8c\x01x\x94\x93\x94.',))
+    assert double(1) == 2
+    assert calls == [1, 1]
+
+
+def test_unpicklable_calls_skip_the_cache(cache):
+    @cache.disk_cache()
+    def identity(x):
+        return x
+
+    def local():
+        return 1
+    assert identity(local) is local
+    assert cache.info()['entries'] == 0
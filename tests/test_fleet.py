@@ -0,0 +1,14 @@
+import numpy as np
+import pandas as pd
+
+from utils.fleet import optimize_chunk
+
+
+def test_no_maintenance_without_wear_out():
+    # Hazard rates not increasing with age: running to failure is optimal
+    table = pd.DataFrame({'shape': [0.8, 1.0, 1.5], 'scale': 20000,
+                          'oh': 5000, 'sfcost': 20000, 'mcost': 3000})
+    out = optimize_chunk(table)
+    assert list(out['success']) == [False, False, True]
+    assert np.isinf(out['interval'][:2]).all()
+    assert np.isfinite(out['interval'][2])
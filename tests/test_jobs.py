@@ -0,0 +1,59 @@
+import threading
+import time
+
+from scipy.stats import exponweib
+
+from reliability.core import submit_simulation
+from utils import jobs
+
+
+def test_done_simulation_drops_its_rounds():
+    dist = exponweib(a=1, c=1.5, scale=20000)
+    job = submit_simulation(dist, 10000, 10, 15000, 1000, 20000, 3000,
+                            seed=0, workers=1)
+    job.wait()
+    assert job.state == 'done'
+    assert 'parts' not in job.data
+    assert len(job.result['cost']) == 1000
+
+
+def test_concurrent_resumes_start_one_run():
+    runs = []
+    gate = threading.Event()
+
+    def steps(job):
+        runs.append(job.done)
+        gate.wait()
+        yield
+        job.done += 1
+        yield
+
+    job = jobs.submit(None, steps, 2)
+    job.cancel()
+    gate.set()
+    job.wait()
+    assert job.state == 'cancelled'
+
+    gate.clear()
+    barrier = threading.Barrier(8)
+    start = job.start
+
+    def slow_start():
+        # Widen the gap between checking the state and starting
+        time.sleep(0.05)
+        start()
+    job.start = slow_start
+
+    def resume():
+        barrier.wait()
+        job.resume()
+    threads = [threading.Thread(target=resume) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    gate.set()
+    job.wait()
+    assert job.state == 'done'
+    assert len(runs) == 2
+    assert job.done == 1
@@ -0,0 +1,34 @@
+import threading
+
+from utils import jobs, profiling
+from utils.profiling import timed
+
+
+@timed('work')
+def work(x):
+    return x
+
+
+def test_collectors_are_per_run():
+    (first, second) = (profiling.Collector(), profiling.Collector())
+
+    def run(collector):
+        with profiling.collecting(collector):
+            work(1)
+    threads = [threading.Thread(target=run, args=(x,))
+               for x in [first, first, second]]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    work(2)
+    assert first.report()[0]['calls'] == 2
+    assert second.report()[0]['calls'] == 1
+
+
+def test_jobs_record_in_the_submitting_run():
+    collector = profiling.Collector()
+    with profiling.collecting(collector):
+        job = jobs.submit(None, jobs.call_steps(work, 1), 1)
+    job.wait()
+    assert collector.report()[0]['calls'] == 1
@@ -0,0 +1,43 @@
+import numpy as np
+from scipy.stats import exponweib
+
+from reliability.core import simulate
+from utils.sim import block_width
+
+
+DIST = exponweib(a=1, c=1.5, scale=20000)
+# Trials of 10 components over 15000 hours, failures 20000, maintenance 3000
+CASE = (10, 15000, 1000, 20000, 3000)
+
+
+def costs(cutoff, seed, sampling='Plain', mtype='Component-wise',
+          width=None):
+    (noc, tlen, rept, sfcost, mcost) = CASE
+    sim = simulate(DIST, cutoff, noc, tlen, rept, sfcost, mcost, mtype=mtype,
+                   seed=seed, workers=1, sampling=sampling, width=width)
+    return sim['cost']['count'].values
+
+
+def test_common_random_numbers():
+    # Same seed and block width: the cutoffs share their lifetimes
+    width = block_width(DIST, 6000, CASE[1])
+    common = costs(6300, 0, width=width) - costs(6000, 0, width=width)
+    independent = costs(6300, 1, width=width) - costs(6000, 0, width=width)
+    assert np.var(common) < np.var(independent)/4
+
+
+def test_sobol_trials_keep_their_variance():
+    # Components of a trial must not be negatively correlated points
+    plain = np.std(costs(10000, 0))
+    for mtype in ['Component-wise', 'Fleetwide']:
+        sobol = np.std(costs(10000, 0, 'Sobol', mtype))
+        assert abs(sobol/plain - 1) < 0.15
+
+
+def test_sobol_chunks_are_independent():
+    # Chunks are separate scrambles, so their means differ
+    (noc, tlen, rept, sfcost, mcost) = CASE
+    sim = simulate(DIST, 10000, noc, tlen, rept, sfcost, mcost,
+                   mtype='Fleetwide', seed=0, workers=1, sampling='Sobol')
+    est = sim['estimate']
+    assert est['high'] - est['low'] > 0
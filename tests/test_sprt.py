@@ -0,0 +1,27 @@
+import numpy as np
+
+from utils.sprt import KEEP, SequentialTest
+
+
+def test_kept_history_is_bounded():
+    # Boundaries never crossed, as for an undecided test over a long stream
+    with np.errstate(divide='ignore'):
+        test = SequentialTest(0, np.inf, 1.5, 20000, keep=True)
+    rng = np.random.default_rng(0)
+    for _ in range(20):
+        test.update(rng.exponential(20000, 10*KEEP),
+                    rng.integers(0, 2, 10*KEEP))
+    cumul = test.cumulative()
+    assert test.rows == 200*KEEP
+    assert len(cumul) <= 2*KEEP
+    assert (np.diff(cumul.index) == test.stride).all()
+
+
+def test_decision_row_is_kept():
+    test = SequentialTest(0.05/0.95, 0.95/0.05, 1.5, 20000, keep=True)
+    rng = np.random.default_rng(0)
+    while test.decision is None:
+        test.update(rng.exponential(15000, 1000), np.ones(1000))
+    cumul = test.cumulative()
+    assert cumul.index[-1] == test.index
+    assert cumul.loc[test.index, 'status'] == test.failures